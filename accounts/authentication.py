@@ -0,0 +1,102 @@
+"""
+Autenticación por token con caché en memoria.
+
+TokenAuthentication de DRF consulta ``authtoken_token`` (con el usuario) en
+cada petición. Aquí los tokens validados se guardan en una caché LRU del
+proceso durante ``TTL`` segundos. Las señales de accounts/signals.py borran
+la entrada cuando se elimina el token (logout) o cuando cambia el usuario
+(por ejemplo, al desactivarlo). Otros procesos no reciben esas señales: en
+ellos un token revocado puede seguir valiendo hasta que venza su TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_cache_config():
+    defaults = {'MAX_ENTRIES': 1024, 'TTL': 60}
+    return {**defaults, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+class TokenCache:
+    """LRU con vencimiento de tokens válidos, indexada por clave y por usuario"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (token, expires)
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if time.monotonic() >= expires:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def add(self, token):
+        with self._lock:
+            self._entries[token.key] = (token, time.monotonic() + self.ttl)
+            self._entries.move_to_end(token.key)
+            self._keys_by_user[token.user_id] = token.key
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def evict(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def evict_user(self, user_id):
+        with self._lock:
+            key = self._keys_by_user.get(user_id)
+            if key is not None:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys_by_user.get(entry[0].user_id) == key:
+            del self._keys_by_user[entry[0].user_id]
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Caché de tokens del proceso (se crea con la configuración de TOKEN_AUTH_CACHE)"""
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                config = token_cache_config()
+                _token_cache = TokenCache(config['MAX_ENTRIES'], config['TTL'])
+    return _token_cache
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication que no consulta la base mientras el token está en la caché"""
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.add(token)
+        # Cada petición recibe su propia copia: la vista puede modificar request.user
+        user = copy.copy(token.user)
+        return user, token
@@ -0,0 +1,133 @@
+import time
+from unittest import mock
+
+import requests
+from django.contrib.auth import authenticate, login
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.testcases import LiveServerThread
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.settings import api_settings
+
+from accounts import views
+from accounts.services import login_user
+
+USERNAME = 'bench_login'
+PASSWORD = 'bench-password-123'
+MODES = ('in-process', 'loopback')
+
+
+def loopback_login_user(base_url):
+    """
+    Reproduce el login_view anterior: POST a /api/login/ de este mismo
+    servidor y después una segunda autenticación local.
+    """
+    def login_via_api(request, data):
+        if request.path == reverse('api_login'):
+            # La propia API (en el hilo del servidor) sigue usando el servicio
+            return login_user(request, data)
+        response = requests.post(f"{base_url}{reverse('api_login')}", json=data, timeout=10)
+        if response.status_code != 200:
+            return None, {'non_field_errors': ['Credenciales inválidas']}
+        user = authenticate(request, username=data['username'], password=data['password'])
+        login(request, user)
+        return user, None
+    return login_via_api
+
+
+class Command(BaseCommand):
+    help = ('Mide el rendimiento de login_view (logins por segundo y hashes de contraseña por login), '
+            'con el servicio en proceso y con la llamada HTTP a la propia API que se usaba antes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Cantidad de logins a medir por modo')
+        parser.add_argument('--mode', choices=[*MODES, 'both'], default='both',
+                            help='in-process (actual), loopback (anterior) o ambos para compararlos')
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        if total < 1:
+            raise CommandError('--requests debe ser al menos 1')
+        modes = MODES if options['mode'] == 'both' else [options['mode']]
+
+        # Base de prueba aparte: el servidor del modo loopback corre en otro
+        # hilo y debe ver el usuario de prueba ya confirmado
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            User.objects.create_user(username=USERNAME, password=PASSWORD)
+            results = {mode: self.measure(mode, total) for mode in modes}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for mode, (rate, p50, p95, hashes) in results.items():
+            self.stdout.write(
+                f'{mode:>10}: {rate:.1f} logins/s, p50 {p50 * 1000:.1f} ms, '
+                f'p95 {p95 * 1000:.1f} ms, {hashes:.1f} hashes por login'
+            )
+        if len(results) == len(MODES):
+            speedup = results['in-process'][0] / results['loopback'][0]
+            self.stdout.write(self.style.SUCCESS(f'in-process atiende {speedup:.2f}x más logins por segundo'))
+
+    def measure(self, mode, total):
+        verify = PBKDF2PasswordHasher.verify
+        # Sin límite anónimo para que el loopback no reciba 429 (y no pague el contador)
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True,
+                               side_effect=verify) as verify_calls, \
+                mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, {'anon': None}):
+            if mode == 'loopback':
+                with LoopbackServer() as base_url, \
+                        mock.patch.object(views, 'login_user', loopback_login_user(base_url)):
+                    durations = self.run_logins(total)
+            else:
+                durations = self.run_logins(total)
+
+        elapsed = sum(durations)
+        durations.sort()
+        return (
+            total / elapsed,
+            durations[len(durations) // 2],
+            durations[max(0, int(len(durations) * 0.95) - 1)],
+            verify_calls.call_count / total,
+        )
+
+    def run_logins(self, total):
+        client = Client()
+        durations = []
+        for _ in range(total):
+            start = time.perf_counter()
+            response = client.post('/login/', {'username': USERNAME, 'password': PASSWORD})
+            durations.append(time.perf_counter() - start)
+            if response.status_code != 302:
+                self.stderr.write(f'Login fallido: HTTP {response.status_code}')
+            client.logout()
+        return durations
+
+
+class LoopbackServer:
+    """Servidor WSGI en un hilo, como LiveServerTestCase, que comparte la base de prueba"""
+
+    def __enter__(self):
+        # La base de prueba de SQLite está en memoria: el hilo usa la misma conexión
+        shared = {conn.alias: conn for conn in connections.all()
+                  if conn.vendor == 'sqlite' and conn.is_in_memory_db()}
+        for conn in shared.values():
+            conn.inc_thread_sharing()
+        self.shared = shared
+        self.thread = LiveServerThread('127.0.0.1', lambda handler: handler, connections_override=shared)
+        self.thread.daemon = True
+        self.thread.start()
+        self.thread.is_ready.wait()
+        if self.thread.error:
+            raise self.thread.error
+        return f'http://127.0.0.1:{self.thread.port}'
+
+    def __exit__(self, *exc_info):
+        self.thread.terminate()
+        for conn in self.shared.values():
+            conn.dec_thread_sharing()
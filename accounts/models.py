@@ -1,3 +1,22 @@
 from django.db import models
 
-# Create your models here.
+
+class ThrottleCounter(models.Model):
+    """
+    Contador de peticiones de una ventana fija por cliente y alcance.
+
+    Una fila por clave (p. ej. ``throttle_anon_127.0.0.1``): la memoria no
+    crece con la cantidad de peticiones. Ver accounts/throttling.py.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    window_start = models.BigIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Para borrar las ventanas vencidas sin recorrer toda la tabla
+            models.Index(fields=['window_start'], name='throttle_window_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}: {self.hits} desde {self.window_start}"
@@ -0,0 +1,57 @@
+"""
+Servicios de autenticación compartidos por las vistas HTML y la API REST.
+
+Antes las vistas HTML llamaban por HTTP a los endpoints /api/ de este mismo
+proceso y luego volvían a autenticar localmente: cada login ocupaba dos
+workers y calculaba dos veces el hash PBKDF2. Ahora ambas capas usan estas
+funciones directamente: un login = un hash, un worker y ningún socket.
+"""
+from django.contrib.auth import login, logout
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .serializers import UserLoginSerializer, UserRegistrationSerializer
+
+
+def register_user(data):
+    """
+    Valida y crea un usuario nuevo.
+
+    Devuelve ``(user, None)`` si se creó o ``(None, errores)`` con los errores
+    del serializer (mismo formato que devuelve /api/register/).
+    """
+    serializer = UserRegistrationSerializer(data=data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    return serializer.save(), None
+
+
+def login_user(request, data):
+    """
+    Verifica las credenciales e inicia la sesión de Django.
+
+    Devuelve ``(user, None)`` o ``(None, errores)``.
+    """
+    serializer = UserLoginSerializer(data=data, context={'request': request})
+    if not serializer.is_valid():
+        return None, serializer.errors
+    user = serializer.validated_data['user']
+    login(request, user)
+    return user, None
+
+
+def logout_user(request, revoke_token=True):
+    """Cierra la sesión de Django y, opcionalmente, revoca el token de la API del usuario"""
+    if revoke_token and request.user.is_authenticated:
+        Token.objects.filter(user=request.user).delete()
+    logout(request)
+
+
+def issue_token(user):
+    """Devuelve el token de la API del usuario, creándolo si no existe"""
+    token, created = Token.objects.get_or_create(user=user)
+    # El cliente lo usará enseguida: su primera petición ya no consulta la base.
+    # No se lee de la caché: podría devolver un token revocado en otro proceso.
+    token.user = user
+    get_token_cache().add(token)
+    return token
@@ -0,0 +1,27 @@
+"""
+Señales de User y Token que mantienen al día el índice de nombres de
+usuario y la caché de tokens.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .usernames import username_index
+
+
+@receiver(post_save, sender=User)
+def index_username(sender, instance, **kwargs):
+    username_index.add(instance.username)
+
+
+@receiver(post_save, sender=User)
+def forget_cached_token(sender, instance, **kwargs):
+    # El usuario cacheado quedó viejo (p. ej. is_active=False); se relee en la próxima petición
+    get_token_cache().evict_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    get_token_cache().evict(instance.key)
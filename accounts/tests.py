@@ -1,3 +1,255 @@
-from django.test import TestCase
+import socket
+import tempfile
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from platzi_store.session_backends import REFRESHED_AT_KEY
+
+from .authentication import get_token_cache
+from .models import ThrottleCounter
+from .throttling import FixedWindowAnonRateThrottle, UsernameCheckRateThrottle, record_hit
+from .usernames import BloomFilter, username_index
+
+
+class AuthViewsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ana', email='ana@test.com', password='clave-segura-123', first_name='Ana'
+        )
+        # Ninguna vista de autenticación debe abrir sockets
+        patcher = mock.patch.object(socket.socket, 'connect', side_effect=AssertionError('socket'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_login_view_hashes_the_password_once(self):
+        verify = PBKDF2PasswordHasher.verify
+        with mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True,
+                               side_effect=verify) as verify_calls:
+            response = self.client.post('/login/', {'username': 'ana', 'password': 'clave-segura-123'})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(verify_calls.call_count, 1)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+    def test_login_view_shows_invalid_credentials(self):
+        response = self.client.post('/login/', {'username': 'ana', 'password': 'incorrecta'})
+        self.assertContains(response, 'Credenciales incorrectas')
+
+    def test_account_pages_render(self):
+        self.client.login(username='ana', password='clave-segura-123')
+        for url in ('/dashboard/', '/profile/', '/settings/'):
+            self.assertContains(self.client.get(url), 'Ana')
+
+    def test_register_view_creates_the_user(self):
+        response = self.client.post('/register/', {
+            'username': 'beto', 'email': 'beto@test.com', 'first_name': 'Beto',
+            'last_name': 'Pérez', 'password1': 'clave-segura-456', 'password2': 'clave-segura-456',
+        })
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+        self.assertTrue(User.objects.get(username='beto').check_password('clave-segura-456'))
+
+    def test_register_view_reports_taken_username(self):
+        response = self.client.post('/register/', {
+            'username': 'ana', 'email': 'otra@test.com', 'first_name': 'Ana',
+            'last_name': 'B', 'password1': 'clave-segura-456', 'password2': 'clave-segura-456',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('username'))
+
+    def test_login_api_returns_token_and_logout_api_revokes_it(self):
+        response = self.client.post('/api/login/', {'username': 'ana', 'password': 'clave-segura-123'},
+                                    content_type='application/json')
+        token = response.json()['token']
+        response = self.client.post('/api/logout/', HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Token.objects.filter(key=token).exists())
+
+
+    def test_web_logout_keeps_the_api_token(self):
+        token = self.client.post('/api/login/', {'username': 'ana', 'password': 'clave-segura-123'},
+                                 content_type='application/json').json()['token']
+        self.client.login(username='ana', password='clave-segura-123')
+        self.client.get('/logout/')
+        self.assertTrue(Token.objects.filter(key=token).exists())
+
+class SessionWriteTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.force_login(self.user)
+
+    def session_writes(self, requests=5):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                self.client.get('/search/', {'q': 'camisa'})
+        return [q['sql'] for q in queries if 'django_session' in q['sql']
+                and q['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT'))]
+
+    def test_unchanged_sessions_are_not_rewritten(self):
+        self.assertEqual(self.session_writes(), [])
+
+    def test_session_is_refreshed_when_close_to_expiring(self):
+        refreshed_at = self.client.session[REFRESHED_AT_KEY]
+        two_days_later = refreshed_at + 2 * 24 * 60 * 60
+        with mock.patch('platzi_store.session_backends.time.time', return_value=two_days_later):
+            self.assertEqual(len(self.session_writes()), 1)
+            self.assertEqual(self.session_writes(), [])
+        self.assertEqual(self.client.session[REFRESHED_AT_KEY], two_days_later)
+
+
+class SessionLogoutTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+
+    def logout_leaves_no_session(self):
+        self.client.force_login(self.user)
+        session_key = self.client.session.session_key
+        self.client.get('/logout/')
+        # Otro worker con un SessionStore nuevo ya no encuentra la sesión
+        store = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+        self.assertEqual(store.load(), {})
+        return session_key
+
+    def test_default_engine_is_the_database(self):
+        self.assertEqual(settings.SESSION_ENGINE, 'platzi_store.session_backends.db')
+        self.logout_leaves_no_session()
+
+    def test_cached_db_logout_clears_the_shared_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                  'LOCATION': directory.name}
+        with self.settings(CACHES={'default': shared},
+                           SESSION_ENGINE='platzi_store.session_backends.cached_db'):
+            session_key = self.logout_leaves_no_session()
+            cache_key = import_module(settings.SESSION_ENGINE).SessionStore(session_key).cache_key
+            self.assertIsNone(caches['default'].get(cache_key))
+
+    @override_settings(SESSION_ENGINE='platzi_store.session_backends.cached_db')
+    def test_cached_db_refuses_a_process_local_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            import_module(settings.SESSION_ENGINE).SessionStore()
+
+
+class UsernameCheckTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        username_index.reset()
+        self.addCleanup(username_index.reset)
+        User.objects.create_user(username='ana', password='clave-segura-123')
+
+    def check(self, username):
+        return self.client.get('/api/check-username/', {'username': username}).json()['available']
+
+    def user_queries(self, queries):
+        # El contador del throttle se escribe en cada petición; aquí solo importa auth_user
+        return [query['sql'] for query in queries if 'auth_user' in query['sql']]
+
+    def test_available_names_do_not_touch_the_users_table(self):
+        self.assertFalse(self.check('ana'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.check('nadie-usa-este-nombre'))
+        self.assertEqual(self.user_queries(queries), [])
+
+    def test_new_users_are_indexed_on_save(self):
+        self.assertTrue(self.check('beto'))
+        User.objects.create_user(username='beto', password='clave-segura-123')
+        self.assertFalse(self.check('beto'))
+
+    def test_batch_checks_several_names_in_one_query(self):
+        self.assertTrue(self.check('warm-up'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/check-usernames/', {'usernames': 'ana, beto,ana'})
+        self.assertEqual(len(self.user_queries(queries)), 1)
+        self.assertEqual(response.json()['available'], {'ana': False, 'beto': True})
+        too_many = ','.join(f'u{i}' for i in range(21))
+        self.assertEqual(self.client.get('/api/check-usernames/', {'usernames': too_many}).status_code, 400)
+
+    def test_has_its_own_throttle_scope(self):
+        with mock.patch.object(UsernameCheckRateThrottle, 'THROTTLE_RATES', {'username_check': '2/minute'}):
+            statuses = [self.client.get('/api/check-username/', {'username': 'x'}).status_code
+                        for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_users_from_other_processes_are_not_skipped_by_local_saves(self):
+        self.assertFalse(self.check('ana'))
+        # bulk_create no envía post_save: es como un alta hecha en otro proceso
+        User.objects.bulk_create([User(username='bob')])
+        # Alta en este proceso con un id mayor que el de bob
+        User.objects.create_user(username='carol', password='clave-segura-123')
+        username_index._refreshed_at = 0.0
+        self.assertFalse(self.check('bob'))
+        self.assertFalse(self.check('carol'))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        names = [f'usuario{i}' for i in range(1000)]
+        for name in names:
+            bloom.add(name)
+        self.assertTrue(all(name in bloom for name in names))
+        false_positives = sum(f'otro{i}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class FixedWindowThrottleTests(TestCase):
+
+    def test_counter_resets_with_each_window(self):
+        self.assertEqual([record_hit('k', 60) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(record_hit('k', 120), 1)
+        self.assertEqual(ThrottleCounter.objects.get(key='k').hits, 1)
+
+    def test_limit_is_shared_and_not_kept_in_the_local_cache(self):
+        rates = {'anon': '2/minute'}
+        with mock.patch.object(FixedWindowAnonRateThrottle, 'THROTTLE_RATES', rates), \
+                mock.patch.object(FixedWindowAnonRateThrottle, 'timer', return_value=600.0):
+            statuses = [self.client.post('/api/login/', {}).status_code for _ in range(2)]
+            # Otro worker tendría otra LocMemCache: vaciarla no cambia nada
+            cache.clear()
+            throttled = self.client.post('/api/login/', {})
+        self.assertEqual(statuses, [400, 400])
+        self.assertEqual(throttled.status_code, 429)
+        self.assertEqual(throttled['Retry-After'], '60')
+        self.assertEqual(ThrottleCounter.objects.get().hits, 3)
+
+
+class CachingTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.addCleanup(get_token_cache().clear)
+        self.user = User.objects.create_user(username='ana', password='clave-segura-123')
+        response = self.client.post('/api/login/', {'username': 'ana', 'password': 'clave-segura-123'})
+        self.auth = {'HTTP_AUTHORIZATION': f"Token {response.json()['token']}"}
+        self.client.logout()
+
+    def token_queries(self, queries):
+        return [query['sql'] for query in queries if 'authtoken_token' in query['sql']]
+
+    def test_cached_token_skips_the_token_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                response = self.client.get('/api/profile/', **self.auth)
+                self.assertEqual(response.json()['user']['username'], 'ana')
+        self.assertEqual(self.token_queries(queries), [])
+
+    def test_logout_revokes_the_cached_token(self):
+        self.assertEqual(self.client.post('/api/logout/', **self.auth).status_code, 200)
+        self.assertEqual(self.client.get('/api/profile/', **self.auth).status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get('/api/profile/', **self.auth).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/profile/', **self.auth).status_code, 401)
@@ -0,0 +1,100 @@
+"""
+Límites de peticiones de la API compartidos por todos los workers.
+
+Los throttles de DRF guardan en la caché una lista con la hora de cada
+petición. Con la LocMemCache cada worker de gunicorn tiene su propia lista,
+así que con N workers el límite real es N veces el configurado, y la lista
+crece con cada petición.
+
+Aquí cada cliente tiene un contador de ventana fija en la tabla
+``accounts_throttlecounter`` de la base de datos (compartida por todos los
+procesos). Un solo ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING``
+incrementa el contador y devuelve el total en la misma sentencia. No hace
+falta leer primero, así que dos workers no pueden ver el mismo valor y
+dejar pasar una petición de más. Funciona igual en SQLite (3.35+) y en
+PostgreSQL.
+"""
+import random
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from .models import ThrottleCounter
+
+TABLE = ThrottleCounter._meta.db_table
+
+HIT_SQL = f"""
+    INSERT INTO {TABLE} ("key", window_start, hits) VALUES (%s, %s, 1)
+    ON CONFLICT ("key") DO UPDATE SET
+        hits = CASE WHEN {TABLE}.window_start = excluded.window_start
+                    THEN {TABLE}.hits + 1 ELSE 1 END,
+        window_start = excluded.window_start
+    RETURNING hits
+"""
+
+# Ventana más larga que admite DRF ('day'); lo anterior ya no cuenta
+MAX_WINDOW = 24 * 60 * 60
+# Una de cada CLEANUP_EVERY peticiones borra los contadores vencidos
+CLEANUP_EVERY = 1000
+
+
+def throttle_database():
+    return getattr(settings, 'THROTTLE_DATABASE', 'default')
+
+
+def record_hit(key, window_start):
+    """Suma una petición a la ventana de ``key`` y devuelve el total de esa ventana"""
+    with connections[throttle_database()].cursor() as cursor:
+        cursor.execute(HIT_SQL, [key, window_start])
+        hits = cursor.fetchone()[0]
+        if random.randrange(CLEANUP_EVERY) == 0:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE window_start < %s",
+                           [window_start - MAX_WINDOW])
+    return hits
+
+
+class FixedWindowRateThrottleMixin:
+    """
+    Reemplaza el historial de DRF por un contador de ventana fija.
+
+    Usa el mismo ``rate`` y la misma clave (``get_cache_key``) que el
+    throttle al que se mezcla; solo cambia dónde y cómo se cuenta.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        window_start = int(self.now // self.duration) * self.duration
+        self.window_end = window_start + self.duration
+        return record_hit(self.key, window_start) <= self.num_requests
+
+    def wait(self):
+        return max(0.0, self.window_end - self.now)
+
+
+class FixedWindowAnonRateThrottle(FixedWindowRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class FixedWindowUserRateThrottle(FixedWindowRateThrottleMixin, UserRateThrottle):
+    """Solo cuenta usuarios autenticados: los anónimos ya los limita el throttle 'anon'"""
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class UsernameCheckRateThrottle(FixedWindowRateThrottleMixin, UserRateThrottle):
+    """
+    Límite aparte para la verificación de nombres de usuario.
+
+    El formulario de registro consulta mientras se escribe; con el límite
+    general 'anon' (100/hour) un registro real se quedaba sin peticiones.
+    """
+    scope = 'username_check'
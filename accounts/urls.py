@@ -22,4 +22,5 @@ urlpatterns = [
     path('api/logout/', views.logout_api, name='api_logout'),
     path('api/profile/', views.user_profile_api, name='api_profile'),
     path('api/check-username/', views.check_username_api, name='api_check_username'),
+    path('api/check-usernames/', views.check_usernames_api, name='api_check_usernames'),
 ]
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Índice en memoria de los nombres de usuario ocupados.
+
+check_username_api se llama mientras el usuario escribe en el formulario de
+registro. Un filtro de Bloom responde "disponible" sin tocar la base de
+datos. Un filtro de Bloom nunca da falsos negativos: si dice que el nombre
+no está, no está. Solo cuando dice que puede estar se confirma con una
+consulta, porque puede dar falsos positivos (~1 %).
+
+El índice se carga con la primera consulta y se actualiza con la señal
+post_save de User. Los usuarios creados por otros procesos se incorporan
+cada ``REFRESH_INTERVAL`` segundos con una consulta por ``id`` mayor al
+último visto *en la base*: post_save no lo mueve, porque un usuario de este
+proceso puede tener un id mayor que los de otros procesos aún no leídos.
+La consulta vuelve a mirar los últimos ``REFRESH_OVERLAP`` ids, ya que en
+PostgreSQL los ids se asignan al insertar pero se ven al hacer commit, y
+pueden aparecer fuera de orden.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.contrib.auth.models import User
+
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 10_000
+REFRESH_INTERVAL = 30
+REFRESH_OVERLAP = 1000
+MAX_BATCH = 20
+
+
+class BloomFilter:
+    """Filtro de Bloom con ``k`` posiciones derivadas de un solo hash (doble hashing)"""
+
+    def __init__(self, capacity, false_positive_rate=FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(value))
+
+
+class UsernameIndex:
+    """Nombres de usuario ocupados: Bloom en memoria + confirmación en la base para los positivos"""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Descarta el índice; se vuelve a cargar con la siguiente consulta"""
+        with self._lock:
+            self._bloom = None
+            self._last_id = 0
+            self._refreshed_at = 0.0
+
+    def warm(self):
+        """Carga todos los nombres existentes (una sola pasada por la tabla)"""
+        with self._lock:
+            total = User.objects.count()
+            bloom = BloomFilter(max(MIN_CAPACITY, total * 2))
+            last_id = 0
+            for user_id, username in User.objects.values_list('id', 'username').iterator(chunk_size=2000):
+                bloom.add(username)
+                last_id = max(last_id, user_id)
+            self._bloom, self._last_id, self._refreshed_at = bloom, last_id, time.monotonic()
+
+    def add(self, username):
+        """Registra un nombre recién creado o cambiado (llamado desde post_save)"""
+        with self._lock:
+            if self._bloom is None:
+                return
+            # No se toca _last_id: solo avanza con lo leído de la base en _fresh_bloom
+            self._add(username)
+
+    def _add(self, username):
+        # Los nombres ya presentes no se cuentan de nuevo: la ventana de
+        # solapamiento relee los mismos usuarios en cada actualización
+        if username not in self._bloom:
+            self._bloom.add(username)
+            if self._bloom.count > self._bloom.capacity:
+                # Lleno: la tasa de falsos positivos sube, se recarga con más capacidad
+                self._bloom = None
+
+    def _fresh_bloom(self):
+        if self._bloom is None:
+            self.warm()
+        with self._lock:
+            if self._bloom is None:
+                # Otro hilo lo descartó justo después de cargarlo
+                return None
+            if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                # Usuarios creados por otros procesos desde la última vez
+                self._refreshed_at = time.monotonic()
+                since = self._last_id - REFRESH_OVERLAP
+                new_users = User.objects.filter(id__gt=since).values_list('id', 'username')
+                for user_id, username in new_users:
+                    self._add(username)
+                    if self._bloom is None:
+                        # Se llenó durante la actualización; la siguiente consulta lo recarga
+                        return None
+                    self._last_id = max(self._last_id, user_id)
+            return self._bloom
+
+    def taken(self, usernames):
+        """Devuelve el subconjunto de ``usernames`` que ya existen"""
+        bloom = self._fresh_bloom()
+        if bloom is None:
+            maybe_taken = list(usernames)
+        else:
+            maybe_taken = [username for username in usernames if username in bloom]
+        if not maybe_taken:
+            return set()
+        return set(User.objects.filter(username__in=maybe_taken).values_list('username', flat=True))
+
+    def is_taken(self, username):
+        return username in self.taken([username])
+
+
+username_index = UsernameIndex()
@@ -1,8 +1,4 @@
-import requests
-import json
 from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.models import User
 from django.contrib import messages
 from django.urls import reverse
 from django.views.decorators.cache import never_cache
@@ -11,17 +7,14 @@ from django.conf import settings
 from .forms import UserRegistrationForm, UserLoginForm
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
-from django.contrib.auth import login, logout
-from django.contrib.auth.models import User
-from .serializers import (
-    UserRegistrationSerializer,
-    UserLoginSerializer,
-    UserSerializer
-)
+from .serializers import UserSerializer
+from .services import register_user, login_user, logout_user, issue_token
+from .throttling import UsernameCheckRateThrottle
+from .usernames import MAX_BATCH, username_index
+from platzi_store.middleware import query_budget
 
 # Nuevas importaciones para las funcionalidades adicionales
 from django.contrib.auth.decorators import login_required
@@ -30,9 +23,6 @@ from django.contrib.auth import update_session_auth_hash
 from django.db.models import Count
 from django.core.paginator import Paginator
 
-# URL base de tu API (configurable desde settings)
-API_BASE_URL = "http://127.0.0.1:8000/api/"
-
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_api(request):
@@ -54,15 +44,12 @@ def register_api(request):
     - 400: Error en validación de datos
     """
     if request.method == 'POST':
-        # Creamos el serializer con los datos recibidos
-        serializer = UserRegistrationSerializer(data=request.data)
+        # Validamos y creamos el usuario con el servicio compartido
+        user, errors = register_user(request.data)
         
-        if serializer.is_valid():
-            # Guardamos el nuevo usuario
-            user = serializer.save()
-            
+        if user is not None:
             # Creamos o obtenemos el token de autenticación para el usuario
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             
             # Preparamos la respuesta con los datos del usuario y su token
             response_data = {
@@ -78,7 +65,7 @@ def register_api(request):
         return Response({
             'success': False,
             'message': 'Error en el registro',
-            'errors': serializer.errors
+            'errors': errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -99,21 +86,12 @@ def login_api(request):
     - 400: Error en credenciales
     """
     if request.method == 'POST':
-        # Creamos el serializer con los datos de login
-        serializer = UserLoginSerializer(
-            data=request.data,
-            context={'request': request}
-        )
+        # Verificamos las credenciales e iniciamos sesión en Django
+        user, errors = login_user(request, request.data)
         
-        if serializer.is_valid():
-            # Obtenemos el usuario validado
-            user = serializer.validated_data['user']
-            
-            # Iniciamos sesión en Django (opcional, para mantener sesión)
-            login(request, user)
-            
+        if user is not None:
             # Creamos o obtenemos el token de autenticación
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             
             # Preparamos la respuesta exitosa
             response_data = {
@@ -129,7 +107,7 @@ def login_api(request):
         return Response({
             'success': False,
             'message': 'Error en la autenticación',
-            'errors': serializer.errors
+            'errors': errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -148,11 +126,8 @@ def logout_api(request):
     """
     if request.method == 'POST':
         try:
-            # Eliminamos el token del usuario
-            request.user.auth_token.delete()
-            
-            # Cerramos la sesión de Django
-            logout(request)
+            # Eliminamos el token del usuario y cerramos la sesión de Django
+            logout_user(request)
             
             return Response({
                 'success': True,
@@ -192,6 +167,7 @@ def user_profile_api(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([UsernameCheckRateThrottle])
 def check_username_api(request):
     """
     Vista API para verificar disponibilidad de nombre de usuario.
@@ -212,8 +188,8 @@ def check_username_api(request):
             'message': 'Debe proporcionar un nombre de usuario'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Verificamos si el username existe
-    exists = User.objects.filter(username=username).exists()
+    # El índice en memoria responde los nombres libres sin consultar la base
+    exists = username_index.is_taken(username)
     
     return Response({
         'success': True,
@@ -221,6 +197,50 @@ def check_username_api(request):
         'message': 'Nombre de usuario no disponible' if exists else 'Nombre de usuario disponible'
     }, status=status.HTTP_200_OK)
 
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@throttle_classes([UsernameCheckRateThrottle])
+def check_usernames_api(request):
+    """
+    Vista API para verificar varios nombres de usuario en una sola llamada.
+    
+    Endpoint: GET /api/check-usernames/?usernames=ana,beto,carla
+    
+    Parámetros de query:
+    - usernames: nombres separados por comas (máximo 20)
+    
+    Respuestas:
+    - 200: Disponibilidad de cada nombre
+    - 400: Sin nombres o demasiados nombres
+    """
+    usernames = list(dict.fromkeys(
+        name.strip() for name in request.GET.get('usernames', '').split(',') if name.strip()
+    ))
+    
+    if not usernames or len(usernames) > MAX_BATCH:
+        return Response({
+            'success': False,
+            'message': f'Debe proporcionar entre 1 y {MAX_BATCH} nombres de usuario'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    taken = username_index.taken(usernames)
+    
+    return Response({
+        'success': True,
+        'available': {name: name not in taken for name in usernames}
+    }, status=status.HTTP_200_OK)
+
+# Campos del formulario HTML que corresponden a los del serializer de registro
+REGISTRATION_FORM_FIELDS = {
+    'username': 'username',
+    'email': 'email',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'password': 'password1',
+    'password2': 'password2',
+}
+
 @csrf_protect
 @never_cache
 def register_view(request):
@@ -234,7 +254,7 @@ def register_view(request):
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
-            # Datos para enviar a la API
+            # Mismos datos y validaciones que /api/register/, sin pasar por HTTP
             user_data = {
                 'username': form.cleaned_data['username'],
                 'email': form.cleaned_data['email'],
@@ -244,59 +264,20 @@ def register_view(request):
                 'password2': form.cleaned_data['password2'],
             }
             
-            try:
-                # Llamada a la API de registro
-                response = requests.post(
-                    f"{API_BASE_URL}register/",
-                    json=user_data,
-                    headers={
-                        'Content-Type': 'application/json'
-                    },
-                    timeout=10
+            user, errors = register_user(user_data)
+            
+            if user is not None:
+                messages.success(
+                    request, 
+                    f'¡Registro exitoso! Bienvenido {user.first_name}. Tu cuenta ha sido creada.'
                 )
-                
-                if response.status_code == 201:
-                    # Registro exitoso
-                    response_data = response.json()
-                    
-                    # Crear usuario localmente en Django
-                    try:
-                        user = User.objects.create_user(
-                            username=user_data['username'],
-                            email=user_data['email'],
-                            first_name=user_data['first_name'],
-                            last_name=user_data['last_name'],
-                            password=user_data['password']
-                        )
-                        messages.success(
-                            request, 
-                            f'¡Registro exitoso! Bienvenido {user.first_name}. Tu cuenta ha sido creada.'
-                        )
-                        return redirect('login')
-                    
-                    except Exception as e:
-                        messages.error(request, 'Error al crear usuario local. Intenta iniciar sesión.')
-                        return redirect('login')
-                        
-                elif response.status_code == 400:
-                    # Error en el registro - procesar errores específicos
-                    try:
-                        error_data = response.json()
-                        if 'username' in error_data:
-                            form.add_error('username', error_data['username'][0])
-                        elif 'email' in error_data:
-                            form.add_error('email', error_data['email'][0])
-                        elif 'error' in error_data:
-                            form.add_error(None, error_data['error'])
-                        else:
-                            form.add_error(None, 'Error en el registro. Verifica tus datos.')
-                    except:
-                        form.add_error(None, 'Error en el servidor. Intenta más tarde.')
-                else:
-                    form.add_error(None, f'Error del servidor: {response.status_code}')
-                        
-            except requests.RequestException as e:
-                form.add_error(None, 'Error de conexión con el servidor. Verifica tu conexión a internet.')
+                return redirect('login')
+            
+            # Mostrar los errores del serializer en el campo correspondiente del formulario
+            for field, field_errors in errors.items():
+                form_field = REGISTRATION_FORM_FIELDS.get(field)
+                for error in field_errors:
+                    form.add_error(form_field, error)
                 
     else:
         form = UserRegistrationForm()
@@ -317,95 +298,24 @@ def login_view(request):
     if request.method == 'POST':
         form = UserLoginForm(request.POST)
         if form.is_valid():
-            username = form.cleaned_data['username']
-            password = form.cleaned_data['password']
-            
-            # Datos para enviar a la API
-            login_data = {
-                'username': username,
-                'password': password,
-            }
+            # Una sola verificación de la contraseña, en este mismo proceso
+            user, errors = login_user(request, {
+                'username': form.cleaned_data['username'],
+                'password': form.cleaned_data['password'],
+            })
             
-            try:
-                # Llamada a la API de login
-                response = requests.post(
-                    f"{API_BASE_URL}login/",
-                    json=login_data,
-                    headers={
-                        'Content-Type': 'application/json'
-                    },
-                    timeout=10
+            if user is not None:
+                messages.success(
+                    request, 
+                    f'¡Bienvenido de nuevo, {user.first_name or user.username}!'
                 )
                 
-                if response.status_code == 200:
-                    # Login exitoso en la API
-                    response_data = response.json()
-                    
-                    # Intentar autenticar localmente en Django
-                    user = authenticate(request, username=username, password=password)
-                    
-                    if user and user.is_active:
-                        # Usuario existe localmente y está activo
-                        login(request, user)
-                        messages.success(
-                            request, 
-                            f'¡Bienvenido de nuevo, {user.first_name or user.username}!'
-                        )
-                        
-                        # Guardar token en sesión si está disponible
-                        if 'access_token' in response_data:
-                            request.session['api_token'] = response_data['access_token']
-                            request.session['refresh_token'] = response_data.get('refresh_token', '')
-                        
-                        # Redirigir a donde el usuario quería ir originalmente
-                        next_url = request.GET.get('next', 'product_list')
-                        return redirect(next_url)
-                    else:
-                        # El usuario existe en la API pero no localmente, crearlo
-                        try:
-                            user_info = response_data.get('user', {})
-                            user = User.objects.create_user(
-                                username=username,
-                                email=user_info.get('email', ''),
-                                first_name=user_info.get('first_name', ''),
-                                last_name=user_info.get('last_name', '')
-                            )
-                            user.set_password(password)
-                            user.save()
-                            
-                            # Autenticar al usuario recién creado
-                            user = authenticate(request, username=username, password=password)
-                            login(request, user)
-                            
-                            messages.success(
-                                request, 
-                                f'¡Bienvenido, {user.first_name or user.username}! Tu cuenta ha sido sincronizada.'
-                            )
-                            
-                            # Guardar tokens
-                            if 'access_token' in response_data:
-                                request.session['api_token'] = response_data['access_token']
-                                request.session['refresh_token'] = response_data.get('refresh_token', '')
-                            
-                            next_url = request.GET.get('next', 'product_list')
-                            return redirect(next_url)
-                            
-                        except Exception as e:
-                            form.add_error(None, 'Error al sincronizar usuario. Contacta al administrador.')
-                            
-                elif response.status_code == 400:
-                    # Error en el login
-                    try:
-                        error_data = response.json()
-                        error_message = error_data.get('error', 'Credenciales inválidas')
-                        form.add_error(None, error_message)
-                    except:
-                        form.add_error(None, 'Credenciales inválidas. Verifica tu usuario y contraseña.')
-                else:
-                    form.add_error(None, f'Error del servidor: {response.status_code}')
-                        
-            except requests.RequestException as e:
-                form.add_error(None, 'Error de conexión con el servidor. Verifica tu conexión a internet.')
+                # Redirigir a donde el usuario quería ir originalmente
+                next_url = request.GET.get('next', 'product_list')
+                return redirect(next_url)
+            
+            for error in errors.get('non_field_errors', ['Credenciales inválidas']):
+                form.add_error(None, error)
                 
     else:
         form = UserLoginForm()
@@ -419,28 +329,8 @@ def logout_view(request):
     """
     username = request.user.username if request.user.is_authenticated else None
     
-    # Opcional: llamar al endpoint de logout de la API
-    if 'api_token' in request.session:
-        try:
-            requests.post(
-                f"{API_BASE_URL}logout/",
-                json={'refresh_token': request.session.get('refresh_token', '')},
-                headers={
-                    'Authorization': f'Bearer {request.session["api_token"]}',
-                    'Content-Type': 'application/json'
-                },
-                timeout=5
-            )
-        except:
-            pass  # Si falla, continuar con el logout local
-        
-        # Limpiar tokens de la sesión
-        del request.session['api_token']
-        if 'refresh_token' in request.session:
-            del request.session['refresh_token']
-    
-    # Cerrar sesión en Django
-    logout(request)
+    # El token de la API solo se emite en /api/login/ y se revoca en /api/logout/
+    logout_user(request, revoke_token=False)
     
     if username:
         messages.success(request, f'Has cerrado sesión exitosamente, {username}. ¡Hasta pronto!')
@@ -452,6 +342,7 @@ def logout_view(request):
 
 # NUEVAS VISTAS PARA DASHBOARD, PERFIL Y CONFIGURACIÓN
 
+@query_budget(5)
 @login_required
 def dashboard(request):
     """
@@ -514,7 +405,7 @@ def dashboard(request):
         'category_stats': category_stats,
     }
     
-    return render(request, 'accounts/dashboard.html', context)
+    return render(request, 'dashboard.html', context)
 
 
 @login_required
@@ -547,7 +438,7 @@ def profile(request):
         'edited_count': edited_count,
     }
     
-    return render(request, 'accounts/profile.html', context)
+    return render(request, 'profile.html', context)
 
 
 @login_required
@@ -587,7 +478,7 @@ def profile_settings(request):
         'user_products_count': user_products_count,
     }
     
-    return render(request, 'accounts/profile_settings.html', context)
+    return render(request, 'profile_settings.html', context)
 
 
 @login_required
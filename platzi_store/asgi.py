@@ -15,3 +15,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "platzi_store.settings")
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATES_WARM_ON_STARTUP:
+    # Cada worker compila las plantillas antes de atender la primera petición
+    from platzi_store.templating import warm_templates  # noqa: E402
+
+    warm_templates()
@@ -0,0 +1,90 @@
+"""
+Ajustes de SQLite para producción y enrutado de lecturas a una réplica.
+
+- ``sqlite_init_command`` arma el ``init_command`` que Django ejecuta al
+  abrir cada conexión (WAL, synchronous=NORMAL, mmap, caché y busy_timeout).
+  Con WAL los lectores no bloquean al escritor ni al revés.
+- ``ReadReplicaRouter`` manda las lecturas de las vistas marcadas con
+  ``use_read_replica`` a la conexión de solo lectura ``replica``. Fuera de
+  esas vistas, o dentro de una transacción, todo va a ``default``.
+
+Este módulo se importa desde settings: no debe importar modelos.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+
+READ_REPLICA_ALIAS = 'replica'
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',       # Lectores y escritor en paralelo
+    'synchronous': 'NORMAL',     # Seguro con WAL; fsync solo en los checkpoints
+    'mmap_size': 256 * 1024 * 1024,  # Lecturas desde memoria mapeada (256 MB)
+    'cache_size': -64 * 1024,    # 64 MB de caché de páginas por conexión (negativo = KiB)
+    'busy_timeout': 5000,        # Esperar hasta 5 s el bloqueo de escritura en vez de fallar
+    'temp_store': 'MEMORY',      # Tablas temporales y ordenamientos en memoria
+}
+
+# journal_mode no se puede cambiar desde una conexión de solo lectura
+SQLITE_REPLICA_PRAGMAS = {
+    name: value for name, value in SQLITE_PRODUCTION_PRAGMAS.items() if name != 'journal_mode'
+}
+
+
+def sqlite_init_command(pragmas):
+    """``init_command`` de OPTIONS con un PRAGMA por ajuste"""
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def read_replica():
+    """Dentro del bloque las lecturas van a la réplica (si está configurada)"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_read_replica(view):
+    """Decorador para vistas (síncronas o asíncronas) que solo leen"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with read_replica():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with read_replica():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    """Lecturas a la réplica solo dentro de read_replica(); escrituras y migraciones a default"""
+
+    def db_for_read(self, model, **hints):
+        from django.db import connections
+
+        if not _replica_reads.get() or READ_REPLICA_ALIAS not in connections.settings:
+            return None
+        # Dentro de una transacción se lee de default para ver las escrituras propias
+        if connections['default'].in_atomic_block:
+            return None
+        return READ_REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != READ_REPLICA_ALIAS
@@ -0,0 +1,273 @@
+"""
+Middleware del proyecto: presupuesto de consultas SQL y perfilado.
+
+Presupuesto de consultas SQL por vista y detección de N+1
+---------------------------------------------------------
+
+``QueryBudgetMiddleware`` cuenta las consultas de cada petición y su tiempo
+total en la base de datos. Usa ``connection.execute_wrapper``, así que no
+necesita DEBUG. Con el resultado:
+
+- agrega los encabezados ``X-DB-Queries`` y ``Server-Timing`` (si
+  ``QUERY_BUDGET['HEADERS']``);
+- avisa en el log cuando la misma sentencia (mismo SQL, parámetros
+  distintos) se repite ``N_PLUS_ONE_THRESHOLD`` veces o más, el síntoma
+  típico de un N+1;
+- compara el total con el presupuesto que la vista declaró con
+  ``@query_budget(n)``. Si lo supera, lo registra en el log o, con
+  ``QUERY_BUDGET['RAISE']`` (activo en los tests, ver test_runner.py), lanza
+  ``QueryBudgetExceeded`` para que el test falle.
+
+El conteo incluye todo lo que pasa dentro de la petición: sesión, usuario,
+throttles y la vista.
+
+Perfilado bajo demanda
+----------------------
+
+``ProfilingMiddleware`` perfila con cProfile (o pyinstrument) las peticiones
+que traen el token firmado de ``manage.py profile_token`` o que caen en la
+muestra ``PROFILING['SAMPLE_RATE']``. Los detalles están en profiling.py.
+
+Ambos middleware funcionan en modo sync y async: bajo ASGI no obligan a
+Django a adaptar la cadena a sync.
+"""
+import logging
+import random
+import time
+from pathlib import Path
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .profiling import (
+    PHASES, is_valid_profile_token, make_recorder, profile_filename, profiling_config, prune_profiles,
+)
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ATTR = 'query_budget'
+
+
+def query_budget_config():
+    defaults = {'RAISE': False, 'HEADERS': settings.DEBUG, 'N_PLUS_ONE_THRESHOLD': 3}
+    return {**defaults, **getattr(settings, 'QUERY_BUDGET', {})}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Una vista hizo más consultas que su presupuesto (es AssertionError para que el test falle)"""
+
+
+# Control de transacciones: cuenta para el tiempo en la base, pero no como
+# consulta (ni para el presupuesto ni como N+1)
+TRANSACTION_CONTROL = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'COMMIT', 'ROLLBACK')
+
+
+class QueryStats:
+    """Consultas ejecutadas, tiempo total y repeticiones de cada sentencia"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Firma de los wrappers de connection.execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            if not sql.lstrip().upper().startswith(TRANSACTION_CONTROL):
+                self.count += 1
+                self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """Sentencias ejecutadas ``threshold`` veces o más: candidatas a N+1"""
+        return [(sql, times) for sql, times in self.statements.most_common() if times >= threshold]
+
+
+@contextmanager
+def capture_query_stats(using=None):
+    """Registra las consultas de todas las bases configuradas (o de ``using``) dentro del bloque"""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for alias in ([using] if using else connections):
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield stats
+
+
+def query_budget(max_queries):
+    """Declara cuántas consultas puede hacer una vista por petición"""
+    def decorator(view):
+        setattr(view, BUDGET_ATTR, max_queries)
+        return view
+    return decorator
+
+
+def budget_for(view_func):
+    budget = getattr(view_func, BUDGET_ATTR, None)
+    if budget is None:
+        # ViewSets y vistas basadas en clases de DRF/Django
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, BUDGET_ATTR, None)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """Debe ir primero en MIDDLEWARE para contar también sesión y autenticación"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Bajo ASGI Django no adapta la cadena a sync (ni ocupa un hilo por petición)
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with capture_query_stats() as stats:
+            response = self.get_response(request)
+        return self.check_budget(request, response, stats)
+
+    async def __acall__(self, request):
+        # Las conexiones son por hilo y el ORM asíncrono corre en el hilo de
+        # sync_to_async(thread_sensitive=True): los wrappers se instalan ahí,
+        # no en el hilo del event loop
+        capture = capture_query_stats()
+        stats = await sync_to_async(capture.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+        return self.check_budget(request, response, stats)
+
+    def check_budget(self, request, response, stats):
+        config = query_budget_config()
+        request.query_stats = stats
+
+        view_name = getattr(request, '_query_budget_view', request.path)
+        for sql, times in stats.repeated(config['N_PLUS_ONE_THRESHOLD']):
+            logger.warning("Posible N+1 en %s: %s consultas iguales: %s", view_name, times, sql[:300])
+
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and stats.count > budget:
+            message = f"{view_name} hizo {stats.count} consultas (presupuesto: {budget})"
+            if config['RAISE']:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        if config['HEADERS']:
+            response['X-DB-Queries'] = str(stats.count)
+            response['Server-Timing'] = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} consultas"'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = budget_for(view_func)
+        # as_view() devuelve una función "View.as_view.<locals>.view": se informa la clase
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        request._query_budget_view = getattr(view_class or view_func, '__qualname__', request.path)
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Va primero en MIDDLEWARE para que el perfil cubra toda la petición.
+
+    Bajo ASGI no adapta la cadena a sync: si la petición no se perfila pasa
+    directo. Las peticiones asíncronas solo se perfilan con pyinstrument
+    (``async_mode``); cProfile mediría todo lo que corre en el event loop, no
+    solo esta petición, así que con cProfile se omiten.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        config = profiling_config()
+        trigger = self.trigger_for(request, config)
+        if trigger is None:
+            return self.get_response(request)
+
+        recorder = make_recorder(config['ENGINE'])
+        try:
+            recorder.start()
+        except ValueError as exc:
+            # Ya hay otro profiler activo en este hilo
+            logger.warning("No se pudo perfilar %s: %s", request.path, exc)
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            recorder.stop()
+        return self.save_profile(request, response, recorder, trigger, config, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        config = profiling_config()
+        trigger = self.trigger_for(request, config)
+        if trigger is None:
+            return await self.get_response(request)
+
+        recorder = make_recorder(config['ENGINE'], async_mode=True)
+        if recorder is None:
+            logger.warning("No se perfila %s: la petición es asíncrona y ENGINE = %r no lo soporta",
+                           request.path, config['ENGINE'])
+            return await self.get_response(request)
+        recorder.start()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            recorder.stop()
+        elapsed = time.perf_counter() - start
+        # Escribir y podar el directorio no debe bloquear el event loop
+        return await sync_to_async(self.save_profile, thread_sensitive=False)(
+            request, response, recorder, trigger, config, elapsed,
+        )
+
+    def save_profile(self, request, response, recorder, trigger, config, elapsed):
+        directory = Path(config['DIR'])
+        directory.mkdir(parents=True, exist_ok=True)
+        name = profile_filename(request, recorder.extension)
+        recorder.write(directory / name)
+        prune_profiles(directory, config['MAX_FILES'], config['MAX_BYTES'])
+
+        phases = recorder.phases()
+        logger.info(
+            "Perfil %s (%s): %s %s en %.1f ms; %s", name, trigger, request.method, request.path,
+            elapsed * 1000, ', '.join(f"{phase} {phases[phase] * 1000:.1f} ms" for phase in PHASES),
+        )
+        if trigger == 'header':
+            # Quien pidió el perfil ve el resumen y el nombre del archivo en la respuesta
+            timings = [f'{phase};dur={phases[phase] * 1000:.1f}' for phase in PHASES]
+            timings.append(f'total;dur={elapsed * 1000:.1f}')
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = ', '.join(([existing] if existing else []) + timings)
+            response['X-Profile'] = name
+        return response
+
+    def trigger_for(self, request, config):
+        """'header', 'sample' o None según por qué se perfila (o no) la petición"""
+        token = request.headers.get(config['HEADER'])
+        if token:
+            if is_valid_profile_token(token, config['TOKEN_MAX_AGE']):
+                return 'header'
+            logger.warning("Token de perfilado inválido o vencido en %s", request.path)
+        if config['SAMPLE_RATE'] and random.random() < config['SAMPLE_RATE']:
+            return 'sample'
+        return None
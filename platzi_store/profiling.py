@@ -0,0 +1,196 @@
+"""
+Perfilado de peticiones bajo demanda (ver ProfilingMiddleware).
+
+Una petición se perfila si trae en ``PROFILING['HEADER']`` un token firmado
+(``python manage.py profile_token``) o si cae en la muestra
+``PROFILING['SAMPLE_RATE']``. El perfil se guarda en ``PROFILING['DIR']``:
+
+- ``cprofile`` (por defecto): archivo ``.prof`` de pstats, para ``snakeviz``
+  o ``python -m pstats``;
+- ``pyinstrument`` (si está instalado): ``.speedscope.json`` para
+  https://www.speedscope.app.
+
+Además del archivo se calcula cuánto tiempo de reloj se fue en cada fase
+(HTTP a la API, decodificación de JSON, SQL y render de plantillas) a partir
+de las funciones de entrada de cada una; así no hay que instrumentar el
+código de la aplicación. Las fases son inclusivas: el render incluye las
+consultas de los QuerySets que se evalúan dentro de la plantilla.
+
+Las vistas asíncronas solo se perfilan con pyinstrument; con cProfile se
+omiten.
+
+El directorio se poda después de cada escritura para no pasar de
+``MAX_FILES`` archivos ni ``MAX_BYTES`` bytes.
+"""
+import cProfile
+import os
+import pstats
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.text import slugify
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument solo es necesario con ENGINE = 'pyinstrument'
+    Profiler = None
+
+TOKEN_SALT = 'platzi_store.profiling'
+TOKEN_VALUE = 'profile'
+
+# (fase, archivo, función): la fase suma el tiempo acumulado de estas funciones
+PHASE_ENTRY_POINTS = (
+    ('http', 'requests/sessions.py', 'request'),
+    ('json', 'json/__init__.py', 'loads'),
+    ('sql', 'django/db/backends/utils.py', '_execute'),
+    ('sql', 'django/db/backends/utils.py', '_executemany'),
+    ('render', 'django/template/backends/django.py', 'render'),
+)
+PHASES = ('http', 'json', 'sql', 'render')
+
+
+def profiling_config():
+    defaults = {
+        'SAMPLE_RATE': 0.0,
+        'HEADER': 'X-Profile',
+        'TOKEN_MAX_AGE': 3600,
+        'ENGINE': 'cprofile',
+        'DIR': Path(settings.BASE_DIR) / 'logs' / 'profiles',
+        'MAX_FILES': 200,
+        'MAX_BYTES': 50 * 1024 * 1024,
+    }
+    return {**defaults, **getattr(settings, 'PROFILING', {})}
+
+
+def make_profile_token():
+    """Token firmado (con SECRET_KEY y fecha) que habilita el perfilado de una petición"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def is_valid_profile_token(token, max_age):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def phase_for(filename, function):
+    filename = filename.replace(os.sep, '/')
+    for phase, suffix, name in PHASE_ENTRY_POINTS:
+        if function == name and filename.endswith(suffix):
+            return phase
+    return None
+
+
+def phases_from_stats(stats):
+    """Segundos por fase a partir de ``pstats.Stats.stats``"""
+    totals = dict.fromkeys(PHASES, 0.0)
+    for (filename, _, function), (_, _, _, cumulative, _) in stats.items():
+        phase = phase_for(filename, function)
+        if phase:
+            totals[phase] += cumulative
+    return totals
+
+
+def phases_from_frame(frame, totals=None):
+    """Segundos por fase a partir del árbol de frames de pyinstrument"""
+    totals = dict.fromkeys(PHASES, 0.0) if totals is None else totals
+    phase = phase_for(frame.file_path or '', frame.function)
+    if phase:
+        # Lo que está debajo ya es parte de esta fase
+        totals[phase] += frame.time
+        return totals
+    for child in frame.children:
+        phases_from_frame(child, totals)
+    return totals
+
+
+class CProfileRecorder:
+    extension = '.prof'
+    # cProfile mide el hilo entero: en el event loop mezclaría peticiones
+    supports_async = False
+
+    def __init__(self, async_mode=False):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def phases(self):
+        return phases_from_stats(pstats.Stats(self.profiler).stats)
+
+    def write(self, path):
+        self.profiler.dump_stats(path)
+
+
+class PyinstrumentRecorder:
+    extension = '.speedscope.json'
+    supports_async = True
+
+    def __init__(self, async_mode=False):
+        if Profiler is None:
+            raise ImproperlyConfigured("PROFILING['ENGINE'] = 'pyinstrument' requiere instalar pyinstrument")
+        # En modo 'enabled' solo se atribuye el tiempo de la tarea de esta petición
+        self.profiler = Profiler(interval=0.001, async_mode='enabled' if async_mode else 'disabled')
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def phases(self):
+        return phases_from_frame(self.profiler.last_session.root_frame())
+
+    def write(self, path):
+        Path(path).write_text(self.profiler.output(SpeedscopeRenderer()))
+
+
+RECORDERS = {'cprofile': CProfileRecorder, 'pyinstrument': PyinstrumentRecorder}
+
+
+def make_recorder(engine, async_mode=False):
+    """Recorder del motor pedido, o None si la petición es asíncrona y el motor no lo soporta"""
+    try:
+        recorder_class = RECORDERS[engine]
+    except KeyError:
+        raise ImproperlyConfigured(f"PROFILING['ENGINE'] desconocido: {engine!r}") from None
+    if async_mode and not recorder_class.supports_async:
+        return None
+    return recorder_class(async_mode=async_mode)
+
+
+def profile_filename(request, extension):
+    slug = slugify(request.path.replace('/', ' '))[:60] or 'root'
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return f"{stamp}-{os.getpid()}-{uuid.uuid4().hex[:6]}-{request.method}-{slug}{extension}"
+
+
+def prune_profiles(directory, max_files, max_bytes):
+    """Borra los perfiles más viejos hasta quedar dentro de ``max_files`` y ``max_bytes``"""
+    entries = []
+    for path in Path(directory).iterdir():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:  # Otro proceso lo borró mientras tanto
+            continue
+        if path.is_file():
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    kept = kept_bytes = removed = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0], reverse=True):
+        if kept < max_files and kept_bytes + size <= max_bytes:
+            kept += 1
+            kept_bytes += size
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -0,0 +1,42 @@
+"""
+Backends de sesión con expiración deslizante "con histéresis".
+
+Con ``SESSION_SAVE_EVERY_REQUEST = True`` Django guarda la sesión en cada
+petición solo para mover su vencimiento, lo que en SQLite es una escritura
+(y un bloqueo de toda la base) por visita. Estos backends guardan la sesión
+cuando cambian sus datos o cuando la vida restante baja de
+``SESSION_REFRESH_THRESHOLD`` segundos; el resto de las peticiones no
+escriben nada. El momento del último guardado viaja dentro de los datos de
+la sesión, así que funciona igual con la caché que con la base de datos.
+"""
+import time
+
+from django.conf import settings
+
+REFRESHED_AT_KEY = '_session_refreshed_at'
+
+
+class HysteresisSessionMixin:
+
+    def get_refresh_threshold(self):
+        # Por defecto se renueva como mucho una vez al día
+        default = self.get_session_cookie_age() - 60 * 60 * 24
+        return getattr(settings, 'SESSION_REFRESH_THRESHOLD', default)
+
+    def needs_refresh(self, now=None):
+        """Indica si la vida restante de la sesión bajó del umbral"""
+        if self.get('_session_expiry') is not None:
+            # Vencimiento personalizado (set_expiry): se mantiene el comportamiento de Django
+            return True
+        refreshed_at = self.get(REFRESHED_AT_KEY)
+        if refreshed_at is None:
+            return True
+        now = time.time() if now is None else now
+        remaining = refreshed_at + self.get_session_cookie_age() - now
+        return remaining < self.get_refresh_threshold()
+
+    def save(self, must_create=False):
+        if not (must_create or self.modified or self.needs_refresh()):
+            return
+        self._session[REFRESHED_AT_KEY] = int(time.time())
+        super().save(must_create)
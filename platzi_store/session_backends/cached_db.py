@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from . import HysteresisSessionMixin
+
+# Cachés propias de cada proceso: un logout en un worker no borraría la
+# sesión de la caché de los demás, que la seguirían dando por válida
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+class SessionStore(HysteresisSessionMixin, cached_db.SessionStore):
+    """Sesiones leídas de la caché (con respaldo en la base) que solo se escriben si cambian o están por vencer"""
+
+    def __init__(self, session_key=None):
+        if isinstance(caches[settings.SESSION_CACHE_ALIAS], PROCESS_LOCAL_CACHES):
+            raise ImproperlyConfigured(
+                "SESSION_STORE = 'cached_db' necesita una caché compartida entre procesos "
+                "(Redis o Memcached, ver REDIS_URL); con una caché local usar 'db'"
+            )
+        super().__init__(session_key)
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import db
+
+from . import HysteresisSessionMixin
+
+
+class SessionStore(HysteresisSessionMixin, db.SessionStore):
+    """Sesiones en la base de datos que solo se escriben si cambian o están por vencer"""
@@ -46,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: perfilado bajo demanda y conteo de consultas de toda la petición
+    # (ver platzi_store/middleware.py)
+    'platzi_store.middleware.ProfilingMiddleware',
+    'platzi_store.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,13 +61,22 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'platzi_store.urls'
 
+# Presupuesto de consultas por vista (@query_budget) y aviso de N+1
+QUERY_BUDGET = {
+    'RAISE': False,            # En producción solo se registra; los tests lo activan
+    'HEADERS': DEBUG,          # X-DB-Queries y Server-Timing en cada respuesta
+    'N_PLUS_ONE_THRESHOLD': 3,  # Repeticiones de una misma sentencia que se informan como N+1
+}
+
+# Los tests fallan si una vista supera su presupuesto de consultas
+TEST_RUNNER = 'platzi_store.test_runner.QueryBudgetTestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [ 
-            BASE_DIR / 'products' / 'templates',
-            BASE_DIR / 'accounts' / 'templates',  # Templates de accounts
-        ],
+        # products/templates y accounts/templates ya los encuentra APP_DIRS;
+        # repetirlos aquí duplicaba las búsquedas en disco de cada plantilla
+        'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -71,11 +84,31 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                # Marcador CSRF en las páginas de la caché de anónimos
+                'products.context_processors.page_cache_csrf',
             ],
         },
     },
 ]
 
+# Perfil de plantillas: 'default' (desarrollo: Django usa el loader cacheado y lo
+# vacía cuando runserver detecta cambios) o 'production' (sin información de
+# depuración, loader cacheado explícito y plantillas precargadas al arrancar)
+TEMPLATE_PROFILE = os.environ.get('TEMPLATE_PROFILE', 'default')
+TEMPLATES_WARM_ON_STARTUP = TEMPLATE_PROFILE == 'production'
+
+if TEMPLATE_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False  # Los loaders se declaran explícitamente
+    TEMPLATES[0]['OPTIONS'].update({
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    })
+
 WSGI_APPLICATION = 'platzi_store.wsgi.application'
 
 
@@ -89,6 +122,71 @@ DATABASES = {
     }
 }
 
+# Motor de base de datos: 'sqlite' (por defecto) o 'postgresql'
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+# Perfil de SQLite: 'default' (desarrollo) o 'production' (SQLite ajustado,
+# conexiones persistentes y réplica de solo lectura; ver platzi_store/database.py)
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+
+if DB_ENGINE == 'postgresql':
+    # Requiere psycopg 3 con el pool: pip install "psycopg[binary,pool]".
+    # Los tests corren igual contra un Postgres local:
+    #   DB_ENGINE=postgresql POSTGRES_DB=platzi_store python manage.py test
+    pool_max_size = int(os.environ.get('POSTGRES_POOL_MAX_SIZE', '10'))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'platzi_store'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # .iterator() usa cursores del servidor (export, migraciones de datos):
+            # las filas llegan por bloques en vez de cargarse todas en memoria.
+            # Detrás de PgBouncer en modo transacción hay que desactivarlos.
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('POSTGRES_SERVER_SIDE_CURSORS', '1') != '1',
+            'OPTIONS': {},
+        }
+    }
+    if pool_max_size > 0:
+        # Pool de psycopg dentro del proceso; es incompatible con CONN_MAX_AGE
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', '2')),
+            'max_size': pool_max_size,
+            'timeout': 10,
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = 600
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+elif DB_PROFILE == 'production':
+    from .database import (
+        SQLITE_PRODUCTION_PRAGMAS, SQLITE_REPLICA_PRAGMAS, sqlite_init_command,
+    )
+
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,          # Reutilizar la conexión entre peticiones
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': sqlite_init_command(SQLITE_PRODUCTION_PRAGMAS),
+            # Toma el bloqueo de escritura al empezar la transacción: evita
+            # errores "database is locked" al pasar de lectura a escritura
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+    if os.environ.get('DB_READ_REPLICA', '1') == '1':
+        # Misma base abierta en modo solo lectura: con WAL lee sin esperar al escritor
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f"file:{DATABASES['default']['NAME']}?mode=ro",
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'init_command': sqlite_init_command(SQLITE_REPLICA_PRAGMAS)},
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_ROUTERS = ['platzi_store.database.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -137,11 +235,53 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # API Configuration
 PLATZI_API_BASE_URL = 'https://api.escuelajs.co/api/v1/'
 
+# Caché del catálogo de la API de Platzi (ver products/catalog.py)
+PLATZI_CATALOG = {
+    'SOURCE': 'api',           # 'api' (consulta en vivo) o 'mirror' (réplica local de sync_catalog)
+    'BACKEND': 'lru',          # 'lru' (memoria del proceso) o 'django' (framework de caché)
+    'CACHE_ALIAS': 'default',  # Alias de CACHES cuando BACKEND = 'django'
+    'MAX_ENTRIES': 512,        # Tamaño máximo de la caché LRU
+    'TTL': 60,                 # Segundos que una respuesta se considera fresca
+    'STALE_TTL': 300,          # Segundos extra en que se sirve vencida mientras se refresca
+    'NEGATIVE_TTL': 30,        # Segundos que se recuerda un 404
+    'STALE_IF_ERROR_TTL': 3600,  # Segundos extra en que se sirve vencida si la API está caída
+    'CONNECT_TIMEOUT': 3.05,   # Timeout de conexión hacia la API
+    'READ_TIMEOUT': 10,        # Timeout de lectura hacia la API
+    'POOL_CONNECTIONS': 4,     # Hosts distintos con pool propio en la Session compartida
+    'POOL_MAXSIZE': 20,        # Conexiones persistentes por host
+    'RETRIES': 2,              # Reintentos de métodos idempotentes (GET, DELETE...)
+    'BACKOFF_FACTOR': 0.3,     # Backoff exponencial entre reintentos
+    'BACKOFF_JITTER': 0.3,     # Aleatoriedad añadida al backoff
+    'BREAKER_FAILURE_THRESHOLD': 5,  # Fallos seguidos que abren el circuit breaker
+    'BREAKER_RESET_TIMEOUT': 30,     # Segundos antes de volver a probar la API
+    'ASYNC_MAX_CONNECTIONS': 100,  # Conexiones del pool httpx de las vistas asíncronas
+    'ASYNC_MAX_KEEPALIVE': 20,     # Conexiones keep-alive que se mantienen abiertas
+}
+
+# Productos por página en cada sección de la lista (paginación por cursor)
+PRODUCTS_PAGE_SIZE = 24
+
+# Segundos que se guardan las páginas de productos para anónimos (products/page_cache.py)
+# y las tarjetas de producto ya renderizadas
+PRODUCTS_PAGE_CACHE_TIMEOUT = 60
+PRODUCTS_CARD_CACHE_TIMEOUT = 3600
+
+# Cola de operaciones pendientes contra la API (ver products/jobs.py)
+UPSTREAM_JOBS = {
+    'BATCH_SIZE': 20,       # Trabajos que reserva un worker en cada vuelta
+    'MAX_ATTEMPTS': 8,      # Intentos antes de marcar el trabajo como fallido
+    'BACKOFF_BASE': 5,      # Segundos del primer reintento (luego se duplica)
+    'BACKOFF_MAX': 600,     # Tope de espera entre reintentos
+    'LEASE': 60,            # Segundos que un worker reserva un trabajo antes de que otro lo retome
+    'CONCURRENCY': 8,       # Llamadas simultáneas a la API dentro de un lote
+}
+
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     # Configuración de autenticación por defecto
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication con caché en memoria de los tokens validados
+        'accounts.authentication.CachingTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     
@@ -168,16 +308,28 @@ REST_FRAMEWORK = {
     ],
     
     # Configuración de throttling (límite de peticiones)
+    # Contadores de ventana fija en la base de datos: el límite es global y no
+    # por worker (ver accounts/throttling.py)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'accounts.throttling.FixedWindowAnonRateThrottle',
+        'accounts.throttling.FixedWindowUserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',  # Para usuarios anónimos
-        'user': '1000/hour'   # Para usuarios autenticados
+        'user': '1000/hour',  # Para usuarios autenticados
+        'username_check': '60/minute',  # check-username, se consulta mientras se escribe
     }
 }
 
+# Alias de DATABASES donde viven los contadores de los throttles
+THROTTLE_DATABASE = 'default'
+
+# Caché de tokens de la API en cada proceso (accounts/authentication.py)
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 1024,  # Tokens recordados por proceso
+    'TTL': 60,            # Segundos que un token revocado en otro proceso puede seguir valiendo
+}
+
 # Configuración de CORS (Cross-Origin Resource Sharing)
 # Importante para permitir peticiones desde frontend en diferentes dominios
 CORS_ALLOWED_ORIGINS = [
@@ -222,10 +374,33 @@ MESSAGE_TAGS = {
     messages.ERROR: 'danger',  # Bootstrap usa 'danger' en lugar de 'error'
 }
 
+# Caché compartida entre procesos (opcional). Sin REDIS_URL cada worker usa su
+# propia LocMemCache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
 # Configuración de sesión
+# 'db' (por defecto): sesiones en la base; solo se escriben cuando hace falta (ver
+# platzi_store/session_backends). 'cached_db': además se leen desde la caché; exige una
+# caché compartida (REDIS_URL), si no un logout en un worker no invalidaría la sesión
+# cacheada en los demás. 'signed_cookies': los datos viajan firmados en la cookie y el
+# servidor no escribe nada, a cambio de no poder revocar sesiones del lado del servidor.
+SESSION_STORE = os.environ.get('SESSION_STORE', 'db')
+SESSION_ENGINE = {
+    'db': 'platzi_store.session_backends.db',
+    'cached_db': 'platzi_store.session_backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_STORE]
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 días
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = True  # Vencimiento deslizante (la cookie se renueva en cada visita)
+# La sesión se vuelve a guardar solo cuando le quedan menos de estos segundos de vida
+SESSION_REFRESH_THRESHOLD = SESSION_COOKIE_AGE - 60 * 60 * 24  # Como mucho una escritura al día
 SESSION_COOKIE_SECURE = False  # Cambiar a True en producción con HTTPS
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
@@ -275,6 +450,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'platzi_store': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -282,6 +462,20 @@ LOGGING = {
 LOGS_DIR = BASE_DIR / 'logs'
 LOGS_DIR.mkdir(exist_ok=True)
 
+# Perfilado bajo demanda (ver platzi_store/profiling.py). Se activa por
+# petición con el encabezado X-Profile (token de `manage.py profile_token`)
+# o para una fracción de las peticiones con PROFILE_SAMPLE_RATE (p. ej. 0.01).
+PROFILING = {
+    'SAMPLE_RATE': float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+    'HEADER': 'X-Profile',
+    'TOKEN_MAX_AGE': 3600,  # segundos de validez del token firmado
+    'ENGINE': os.environ.get('PROFILE_ENGINE', 'cprofile'),  # 'cprofile' (.prof) o 'pyinstrument' (speedscope)
+    'DIR': LOGS_DIR / 'profiles',
+    # Tope de disco: se borran los perfiles más viejos
+    'MAX_FILES': 200,
+    'MAX_BYTES': 50 * 1024 * 1024,
+}
+
 
 if DEBUG:
     # Configuraciones adicionales para desarrollo
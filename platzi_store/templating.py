@@ -0,0 +1,72 @@
+"""
+Utilidades del motor de plantillas: listar y precargar las plantillas del
+proyecto.
+
+Con el loader cacheado (activo por defecto desde Django 4.1) cada plantilla
+se lee y se compila una sola vez por proceso, la primera vez que se usa.
+``warm_templates`` adelanta ese trabajo al arranque del worker (ver wsgi.py y
+asgi.py), así la primera visita a cada página no paga el parseo de base.html.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def django_engine():
+    return engines['django'].engine
+
+
+def template_dirs(engine=None, include_third_party=False):
+    """Directorios que recorren los loaders del motor (los de terceros solo si se piden)"""
+    engine = engine or django_engine()
+    dirs = []
+    for loader in engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            for directory in inner.get_dirs():
+                directory = os.fspath(directory)
+                if not include_third_party and not directory.startswith(os.fspath(settings.BASE_DIR)):
+                    continue
+                if directory not in dirs:
+                    dirs.append(directory)
+    return dirs
+
+
+def template_names(engine=None, include_third_party=False):
+    """Nombres (relativos al directorio de plantillas) de todas las plantillas encontradas"""
+    names = []
+    for directory in template_dirs(engine, include_third_party):
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                if filename.endswith(TEMPLATE_EXTENSIONS):
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    if name not in names:
+                        names.append(name)
+    return names
+
+
+def warm_templates(names=None, engine=None):
+    """
+    Compila las plantillas para que queden en el loader cacheado.
+
+    Devuelve una lista de ``(nombre, segundos, error)``; ``error`` es None si
+    la plantilla compiló bien.
+    """
+    engine = engine or django_engine()
+    results = []
+    for name in names if names is not None else template_names(engine):
+        start = time.perf_counter()
+        try:
+            engine.get_template(name)
+            error = None
+        except TemplateSyntaxError as exc:
+            logger.warning("La plantilla %s no compila: %s", name, exc)
+            error = exc
+        results.append((name, time.perf_counter() - start, error))
+    return results
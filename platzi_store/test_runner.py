@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Runner de tests que convierte en fallo cualquier vista que exceda su presupuesto de consultas"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET = {**getattr(settings, 'QUERY_BUDGET', {}), 'RAISE': True}
@@ -0,0 +1,183 @@
+"""
+API REST de productos (``/api/products/``).
+
+Pensada para clientes que consultan la lista una y otra vez:
+
+- Cada respuesta lleva ``ETag`` y ``Last-Modified`` calculados a partir de
+  ``updated_at``, sin serializar nada. Si el cliente envía ``If-None-Match``
+  (o ``If-Modified-Since``) y nada cambió, se responde 304 tras una sola
+  consulta liviana.
+- La representación JSON de cada fila se guarda en la caché con una clave
+  que incluye su ``updated_at``: una fila editada cambia de clave y nunca se
+  sirve una versión vieja.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from platzi_store.middleware import query_budget
+
+from .jobs import batch_report, queue_deletions
+from .models import Product, category_key_for
+from .serializers import ProductSerializer
+
+# Cambiar al modificar ProductSerializer para descartar las representaciones cacheadas
+REPRESENTATION_VERSION = 1
+REPRESENTATION_TIMEOUT = 60 * 60
+# Tope de ids por lista en el borrado masivo: queue_deletions los pone en un
+# solo IN y SQLite anterior a 3.32 admite 999 parámetros por consulta
+BULK_DELETE_MAX_IDS = 300
+
+
+def representation_key(product):
+    return f"products:api:v{REPRESENTATION_VERSION}:{product.pk}:{product.updated_at.timestamp()}"
+
+
+def cached_representations(products, serializer_class=ProductSerializer):
+    """Serializa ``products`` reutilizando las representaciones cacheadas por fila"""
+    keys = {product.pk: representation_key(product) for product in products}
+    cached = cache.get_many(keys.values())
+    missing = [product for product in products if keys[product.pk] not in cached]
+    if missing:
+        fresh = {keys[product.pk]: dict(serializer_class(product).data) for product in missing}
+        cache.set_many(fresh, REPRESENTATION_TIMEOUT)
+        cached.update(fresh)
+    return [cached[keys[product.pk]] for product in products]
+
+
+def make_etag(*parts):
+    """ETag fuerte a partir de los valores que determinan la respuesta"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """Ids locales y/o ids de la API a borrar"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list,
+                                max_length=BULK_DELETE_MAX_IDS)
+    api_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list,
+                                    max_length=BULK_DELETE_MAX_IDS)
+
+    def validate(self, attrs):
+        if not attrs['ids'] and not attrs['api_ids']:
+            raise serializers.ValidationError('Indica al menos un id en "ids" o "api_ids"')
+        return attrs
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+@query_budget(15)
+class ProductViewSet(viewsets.ModelViewSet):
+    """
+    CRUD de productos con GET condicional.
+
+    Filtros opcionales: ``?category=`` y ``?origin=``.
+
+    ``POST bulk-delete/`` borra muchos productos de una vez (solo staff): las
+    filas locales se eliminan en la misma petición y los DELETE a la API se
+    encolan para process_upstream_jobs. ``GET bulk-delete/<lote>/`` informa
+    el resultado de cada id.
+    """
+    serializer_class = ProductSerializer
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        # Mismo orden (e índice) que la sección local de product_list
+        products = Product.objects.order_by('-created_at', 'id')
+        category = self.request.query_params.get('category')
+        if category:
+            products = products.filter(category_key=category_key_for(category))
+        origin = self.request.query_params.get('origin')
+        if origin:
+            products = products.filter(origin=origin)
+        return products
+
+    def validators_for(self, *parts):
+        # El formato (JSON o API navegable) forma parte de la representación
+        return make_etag(self.request.accepted_renderer.format, *parts)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Cualquier alta, baja o edición cambia el conteo o el updated_at máximo
+        state = queryset.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        etag = self.validators_for(request.get_full_path(), state['count'], state['last_modified'])
+        not_modified = get_conditional_response(
+            request, etag=etag,
+            last_modified=state['last_modified'].timestamp() if state['last_modified'] else None,
+        )
+        if not_modified is not None:
+            return set_validators(not_modified, etag, state['last_modified'])
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(cached_representations(page))
+        else:
+            response = Response(cached_representations(list(queryset)))
+        return set_validators(response, etag, state['last_modified'])
+
+    def retrieve(self, request, *args, **kwargs):
+        # Primero solo updated_at: con eso se decide el 304 sin cargar ni serializar la fila
+        updated_at = (
+            self.filter_queryset(self.get_queryset())
+            .filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        )
+        if updated_at is None:
+            raise Http404
+        etag = self.validators_for(kwargs['pk'], updated_at)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=updated_at.timestamp()
+        )
+        if not_modified is not None:
+            return set_validators(not_modified, etag, updated_at)
+
+        product = self.get_object()
+        return set_validators(Response(cached_representations([product])[0]), etag, updated_at)
+
+    def perform_destroy(self, instance):
+        # Igual que delete_product: si se publicó desde aquí, se borra también de la API
+        queue_deletions(product_ids=[instance.pk])
+
+    def perform_update(self, serializer):
+        product = serializer.instance
+        if product.origin == Product.ORIGIN_MIRROR:
+            # Igual que edit_api_product: una réplica editada pasa a ser copia local
+            serializer.save(origin=Product.ORIGIN_API_COPY)
+        else:
+            serializer.save()
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete', permission_classes=[IsAdminUser])
+    def bulk_delete(self, request):
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        batch, deleted, api_ids = queue_deletions(product_ids=data['ids'], api_ids=data['api_ids'])
+        return Response({
+            'batch': batch,
+            'deleted_locally': deleted,
+            'queued_api_ids': api_ids,
+            # Sin ids de la API no hay nada que seguir
+            'status_url': reverse('product-api-bulk-delete-status', args=[batch], request=request)
+            if api_ids else None,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'bulk-delete/(?P<batch>[0-9a-f]{32})',
+            permission_classes=[IsAdminUser])
+    def bulk_delete_status(self, request, batch=None):
+        report = batch_report(batch)
+        if not report['total']:
+            raise Http404
+        return Response(report)
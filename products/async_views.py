@@ -0,0 +1,127 @@
+"""
+Versiones asíncronas (ASGI) de las vistas de productos.
+
+En lugar de bloquear un hilo mientras responde la API de Platzi, estas
+vistas usan el cliente httpx compartido del catálogo y lanzan la consulta a
+la API y las consultas al ORM al mismo tiempo. Sirven bajo un servidor ASGI
+(por ejemplo ``uvicorn platzi_store.asgi:application``).
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.shortcuts import render, redirect
+
+from platzi_store.database import use_read_replica
+from platzi_store.middleware import query_budget
+
+from .catalog import get_catalog, mirror_enabled, CatalogError, CatalogUnavailable
+from .jobs import queue_deletions, queue_product_creation
+from .models import Product
+from .page_cache import anonymous_page_cache
+from .views import (
+    API_DELETED_MESSAGE,
+    CREATED_MESSAGE,
+    EMPTY_API_SECTION,
+    api_error_message,
+    api_payload_from_post,
+    api_section_from_catalog,
+    api_section_from_mirror,
+    build_product_list_context,
+    local_copy_api_ids,
+    local_product_from_payload,
+    local_section_for,
+)
+
+# render() recorre QuerySets y context processors que usan el ORM
+async_render = sync_to_async(render)
+
+
+async def evaluate(queryset):
+    """Evalúa un QuerySet de forma asíncrona y devuelve la lista de resultados"""
+    return [item async for item in queryset]
+
+
+async def fetch_api_section(request, category_filter, cursor):
+    """Sección de productos de la API, leída de la réplica local o de la API"""
+    if mirror_enabled():
+        return await sync_to_async(api_section_from_mirror)(category_filter, cursor)
+    try:
+        all_api_products = await get_catalog().alist_products()
+    except CatalogUnavailable as exc:
+        # La API no responde: se usa la réplica local de sync_catalog, si la hay
+        api_section = await sync_to_async(api_section_from_mirror)(category_filter, cursor)
+        if not api_section[1]:
+            messages.error(request, api_error_message(exc))
+        return api_section
+    except CatalogError as exc:
+        messages.error(request, api_error_message(exc))
+        return EMPTY_API_SECTION
+    local_api_ids = set(await evaluate(local_copy_api_ids()))
+    return api_section_from_catalog(all_api_products, category_filter, cursor, local_api_ids)
+
+
+@query_budget(10)
+@anonymous_page_cache
+@use_read_replica
+async def product_list_async(request):
+    """Versión asíncrona de product_list"""
+    category_filter = request.GET.get('category', 'all')
+
+    # La API y la base de datos se consultan en paralelo
+    api_section, local_section = await asyncio.gather(
+        fetch_api_section(request, category_filter, request.GET.get('api_cursor')),
+        sync_to_async(local_section_for)(category_filter, request.GET.get('cursor')),
+    )
+
+    context = build_product_list_context(request, category_filter, api_section, local_section)
+    return await async_render(request, 'products/product_list.html', context)
+
+
+@query_budget(5)
+@anonymous_page_cache
+@use_read_replica
+async def product_detail_async(request, product_id):
+    """Versión asíncrona de product_detail"""
+    if mirror_enabled():
+        local_product = await Product.objects.filter(api_id=product_id).afirst()
+        product = local_product.as_api_dict() if local_product else None
+    else:
+        try:
+            product = await get_catalog().aget_product(product_id)
+        except CatalogError as exc:
+            # Si la API no responde se intenta con la copia local del producto
+            local_product = None
+            if isinstance(exc, CatalogUnavailable):
+                local_product = await Product.objects.filter(api_id=product_id).afirst()
+            if local_product is None:
+                messages.error(request, "Error al cargar el producto")
+                return redirect('product_list')
+            product = local_product.as_api_dict()
+
+    if product is None:
+        messages.error(request, "Producto no encontrado")
+        return redirect('product_list')
+
+    return await async_render(request, 'products/product_detail.html', {'product': product})
+
+
+@query_budget(12)
+async def create_product_async(request):
+    """Versión asíncrona de create_product"""
+    if request.method == 'POST':
+        data = api_payload_from_post(request.POST)
+        await sync_to_async(queue_product_creation)(local_product_from_payload(data), data)
+        messages.success(request, CREATED_MESSAGE)
+        return redirect('product_list')
+
+    return await async_render(request, 'products/create_product.html')
+
+
+async def api_delete_product_async(request, product_id):
+    """Versión asíncrona de api_delete_product"""
+    if request.method == 'POST':
+        await sync_to_async(queue_deletions)(api_ids=[product_id])
+        messages.success(request, API_DELETED_MESSAGE)
+
+    return redirect('product_list')
@@ -0,0 +1,141 @@
+"""
+Importación y exportación masiva de productos.
+
+La importación lee el archivo como un flujo (fila por fila, sin cargarlo en
+memoria), valida cada fila con ProductSerializer y guarda los productos
+válidos en lotes con ``bulk_create``, un lote por transacción. Como
+``bulk_create`` no envía señales, los conteos de CategoryFacet se ajustan
+aquí (el índice de búsqueda lo mantienen los triggers de la base de datos).
+
+La exportación recorre la tabla con ``iterator(chunk_size=...)`` y genera
+CSV o NDJSON línea por línea para StreamingHttpResponse, así que la memoria
+usada no depende de la cantidad de productos.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .facets import FacetDeltas
+from .models import Product, category_key_for
+from .page_cache import bump_page_version
+from .serializers import ProductSerializer
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_FIELDS = [
+    'id', 'api_id', 'origin', 'title', 'price', 'description', 'category', 'image',
+    'created_at', 'updated_at',
+]
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(ValueError):
+    """El archivo no tiene un formato de importación válido"""
+
+
+def format_for_filename(filename, default='csv'):
+    """Formato de importación según la extensión del archivo"""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, file_format):
+    """
+    Recorre las filas de un archivo binario (subida o archivo abierto en 'rb').
+
+    Devuelve pares ``(número de línea, diccionario)``. Una línea NDJSON que no
+    es JSON válido se devuelve con un ImportFormatError en lugar del
+    diccionario: cuenta como fila inválida y la importación sigue.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'ndjson':
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                row = ImportFormatError(f"JSON inválido ({exc})")
+            yield line_number, row
+    else:
+        raise ImportFormatError(f"Formato no soportado: {file_format}")
+
+
+def import_products(stream, file_format='csv', batch_size=1000):
+    """
+    Importa productos locales desde un archivo CSV o NDJSON.
+
+    Devuelve un diccionario con ``imported``, ``invalid`` y ``errors`` (los
+    primeros errores de validación, con su número de línea).
+    """
+    stats = {'imported': 0, 'invalid': 0, 'errors': []}
+    # Una sola instancia: sus campos se construyen una vez y se reutilizan en cada fila
+    serializer = ProductSerializer()
+    rows = iter_rows(stream, file_format)
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        products = []
+        for line_number, row in batch:
+            try:
+                if isinstance(row, ImportFormatError):
+                    raise serializers.ValidationError({'non_field_errors': [str(row)]})
+                data = serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                stats['invalid'] += 1
+                if len(stats['errors']) < MAX_REPORTED_ERRORS:
+                    stats['errors'].append({'line': line_number, 'errors': exc.detail})
+                continue
+            products.append(Product(
+                **data,
+                origin=Product.ORIGIN_LOCAL,
+                category_key=category_key_for(data['category']),
+            ))
+        _save_batch(products)
+        stats['imported'] += len(products)
+
+    return stats
+
+
+def _save_batch(products):
+    facet_deltas = FacetDeltas()
+    for product in products:
+        facet_deltas.add(product.category, product.origin, product.api_id)
+    with transaction.atomic():
+        Product.objects.bulk_create(products)
+        facet_deltas.apply()
+        # bulk_create no envía post_save: las páginas cacheadas se invalidan aquí
+        bump_page_version()
+
+
+class Echo:
+    """Archivo de solo escritura que devuelve lo escrito (para csv.writer en streaming)"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, file_format='csv', chunk_size=2000):
+    """Genera el contenido de la exportación línea por línea"""
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    if file_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str, ensure_ascii=False) + '\n'
+    else:
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
@@ -0,0 +1,477 @@
+"""
+Cliente del catálogo de la API de Platzi.
+
+Todas las vistas consultan la API a través de este módulo, que guarda las
+respuestas en una caché con TTL por entrada. Cuando una entrada vence pero
+sigue dentro de la ventana "stale" se devuelve inmediatamente y se refresca
+en segundo plano (stale-while-revalidate). Los 404 también se guardan
+(caché negativa) para no repetir consultas a productos inexistentes.
+
+Si varias peticiones del mismo proceso encuentran la caché vacía a la vez,
+solo una consulta la API y las demás esperan su resultado (single-flight).
+
+Las llamadas salen por la Session compartida de ``products.upstream`` y
+pasan por un circuit breaker: mientras la API está caída se falla de
+inmediato y se sigue sirviendo lo que haya en caché aunque esté vencido
+(stale-if-error).
+
+Los métodos con prefijo ``a`` (``alist_products``, ``aget_product``...) son
+las variantes asíncronas para las vistas ASGI: comparten la misma caché y
+abren un cliente httpx por llamada que se cierra al terminar.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.dispatch import Signal
+
+from .upstream import CircuitBreaker, build_session, pool_metrics
+
+try:
+    import httpx
+except ImportError:  # httpx solo es necesario para las vistas asíncronas
+    httpx = None
+
+# Se envía cuando cambia lo que el catálogo tiene en caché (respuesta nueva
+# distinta de la anterior, alta, baja o invalidación). Argumento: ``key``.
+catalog_changed = Signal()
+
+
+class CatalogError(Exception):
+    """La API de Platzi respondió con un estado inesperado"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CatalogUnavailable(CatalogError):
+    """No se pudo conectar con la API de Platzi"""
+
+
+class CircuitOpen(CatalogUnavailable):
+    """El circuit breaker está abierto: no se intenta llamar a la API"""
+
+
+class CacheEntry:
+    """Valor guardado en caché junto con sus tiempos de expiración"""
+
+    __slots__ = ('value', 'fresh_until', 'stale_until', 'expires')
+
+    def __init__(self, value, fresh_until, stale_until, expires=None):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        # Hasta cuándo se guarda para servirla si la API falla (stale-if-error)
+        self.expires = stale_until if expires is None else expires
+
+    def is_fresh(self, now):
+        return now < self.fresh_until
+
+    def is_usable(self, now):
+        return now < self.stale_until
+
+
+class InFlightCall:
+    """Consulta en curso a la API que otros hilos pueden esperar"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LRUCacheBackend:
+    """Caché en memoria del proceso con política LRU"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() >= entry.expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DjangoCacheBackend:
+    """Caché respaldada por el framework de caché de Django (compartida entre procesos)"""
+
+    def __init__(self, alias='default', prefix='platzi_catalog'):
+        self.alias = alias
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        entry = self.cache.get(self._key(key))
+        if entry is None or time.time() >= entry.expires:
+            return None
+        return entry
+
+    def set(self, key, entry):
+        timeout = max(1, int(entry.expires - time.time()))
+        self.cache.set(self._key(key), entry, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+
+class CatalogClient:
+    """Acceso cacheado a los productos de la API de Platzi"""
+
+    LIST_KEY = 'products'
+
+    def __init__(self, base_url, backend=None, ttl=60, stale_ttl=300,
+                 negative_ttl=30, stale_if_error_ttl=3600, timeout=(3.05, 10),
+                 session=None, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.backend = backend if backend is not None else LRUCacheBackend()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.stale_if_error_ttl = stale_if_error_ttl
+        self.timeout = timeout  # (conexión, lectura) en segundos
+        self.session = session if session is not None else build_session()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._async_in_flight = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def product_key(product_id):
+        return f"product:{product_id}"
+
+    def product_url(self, product_id):
+        return f"{self.base_url}/{product_id}"
+
+    def list_products(self):
+        """Devuelve la lista completa de productos de la API"""
+        return self._get(self.LIST_KEY, self.base_url)
+
+    def get_product(self, product_id):
+        """Devuelve un producto de la API o None si no existe"""
+        return self._get(self.product_key(product_id), self.product_url(product_id))
+
+    def fetch_page(self, offset, limit):
+        """Descarga una página del catálogo sin pasar por la caché (usado por sync_catalog)"""
+        response = self._request('GET', self.base_url, params={'offset': offset, 'limit': limit})
+        if response.status_code != 200:
+            raise CatalogError(f"GET {self.base_url} -> {response.status_code}", response.status_code)
+        return response.json()
+
+    def create_product(self, data, idempotency_key=None):
+        """
+        Crea un producto en la API y devuelve el producto creado.
+
+        ``idempotency_key`` viaja en el encabezado ``Idempotency-Key`` para que
+        un reintento del mismo alta no duplique el producto si la API lo respeta.
+        """
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        response = self._request('POST', self.base_url, json=data, headers=headers)
+        if response.status_code != 201:
+            raise CatalogError(f"POST {self.base_url} -> {response.status_code}", response.status_code)
+        self.backend.delete(self.LIST_KEY)
+        catalog_changed.send(sender=self.__class__, key=self.LIST_KEY)
+        return response.json()
+
+    def delete_product(self, product_id):
+        """Elimina un producto de la API"""
+        url = self.product_url(product_id)
+        response = self._request('DELETE', url)
+        if response.status_code != 200:
+            raise CatalogError(f"DELETE {url} -> {response.status_code}", response.status_code)
+        self.invalidate(product_id)
+
+    def invalidate(self, product_id=None):
+        """Descarta la lista cacheada y, opcionalmente, un producto"""
+        self.backend.delete(self.LIST_KEY)
+        if product_id is not None:
+            self.backend.delete(self.product_key(product_id))
+        catalog_changed.send(sender=self.__class__, key=self.LIST_KEY)
+
+    def metrics(self):
+        """Estado del circuit breaker y uso del pool de conexiones"""
+        return {
+            'breaker': self.breaker.metrics(),
+            'pool': pool_metrics(self.session),
+        }
+
+    def _request(self, method, url, **kwargs):
+        """Llama a la API a través del circuit breaker y la Session compartida"""
+        if not self.breaker.allow_request():
+            raise CircuitOpen(f"{method} {url}: circuit breaker abierto")
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            self.breaker.record_failure()
+            raise CatalogUnavailable(str(exc)) from exc
+        self._record_status(response.status_code)
+        return response
+
+    def _record_status(self, status_code):
+        if status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _get(self, key, url):
+        now = time.time()
+        entry = self.backend.get(key)
+        if entry is not None and entry.is_usable(now):
+            if not entry.is_fresh(now):
+                self._refresh_in_background(key, url)
+            return entry.value
+        try:
+            return self._refresh(key, url)
+        except CatalogUnavailable:
+            if entry is None:
+                raise
+            # La API no responde: mejor una copia vencida que nada
+            return entry.value
+
+    def _refresh(self, key, url):
+        with self._in_flight_lock:
+            call = self._in_flight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._in_flight[key] = InFlightCall()
+
+        if not is_leader:
+            # Otra petición ya está consultando esta llave: esperar su resultado
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = self._fetch(key, url)
+        except CatalogError as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.value
+
+    def _fetch(self, key, url):
+        return self._store(key, url, self._request('GET', url))
+
+    def _store(self, key, url, response):
+        """Guarda en caché la respuesta de un GET (requests o httpx) y devuelve su contenido"""
+        now = time.time()
+        if response.status_code == 404:
+            # Caché negativa: el producto no existe, no volver a preguntar por un rato
+            expires = now + self.negative_ttl
+            self.backend.set(key, CacheEntry(None, expires, expires))
+            return None
+        if response.status_code != 200:
+            raise CatalogError(f"GET {url} -> {response.status_code}", response.status_code)
+
+        value = response.json()
+        previous = self.backend.get(key)
+        fresh_until = now + self.ttl
+        stale_until = fresh_until + self.stale_ttl
+        self.backend.set(key, CacheEntry(value, fresh_until, stale_until,
+                                         stale_until + self.stale_if_error_ttl))
+        if previous is not None and previous.value != value:
+            # La primera carga no cuenta: ninguna página pudo mostrar estos datos antes
+            catalog_changed.send(sender=self.__class__, key=key)
+        return value
+
+    def _refresh_in_background(self, key, url):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._refresh(key, url)
+            except CatalogError:
+                # Se sigue sirviendo la copia vencida hasta el próximo intento
+                pass
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # Variantes asíncronas
+
+    async def alist_products(self):
+        """Versión asíncrona de list_products"""
+        return await self._aget(self.LIST_KEY, self.base_url)
+
+    async def aget_product(self, product_id):
+        """Versión asíncrona de get_product"""
+        return await self._aget(self.product_key(product_id), self.product_url(product_id))
+
+    async def acreate_product(self, data, idempotency_key=None):
+        """Versión asíncrona de create_product"""
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        response = await self._arequest('POST', self.base_url, json=data, headers=headers)
+        if response.status_code != 201:
+            raise CatalogError(f"POST {self.base_url} -> {response.status_code}", response.status_code)
+        self.backend.delete(self.LIST_KEY)
+        await catalog_changed.asend(sender=self.__class__, key=self.LIST_KEY)
+        return response.json()
+
+    async def adelete_product(self, product_id):
+        """Versión asíncrona de delete_product"""
+        url = self.product_url(product_id)
+        response = await self._arequest('DELETE', url)
+        if response.status_code != 200:
+            raise CatalogError(f"DELETE {url} -> {response.status_code}", response.status_code)
+        self.invalidate(product_id)
+
+    async def _aget(self, key, url):
+        now = time.time()
+        entry = self.backend.get(key)
+        if entry is not None and entry.is_usable(now):
+            if not entry.is_fresh(now):
+                self._refresh_in_background(key, url)
+            return entry.value
+
+        # Single-flight dentro del event loop: las corrutinas comparten la misma tarea
+        in_flight = self._async_in_flight.setdefault(asyncio.get_running_loop(), {})
+        task = in_flight.get(key)
+        if task is None:
+            task = in_flight[key] = asyncio.ensure_future(self._afetch(key, url))
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+        try:
+            return await asyncio.shield(task)
+        except CatalogUnavailable:
+            if entry is None:
+                raise
+            return entry.value
+
+    async def _afetch(self, key, url):
+        response = await self._arequest('GET', url)
+        return self._store(key, url, response)
+
+    async def _arequest(self, method, url, **kwargs):
+        if not self.breaker.allow_request():
+            raise CircuitOpen(f"{method} {url}: circuit breaker abierto")
+        if isinstance(self.timeout, tuple):
+            connect_timeout, read_timeout = self.timeout
+            timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        else:
+            timeout = self.timeout
+        try:
+            async with make_async_http_client() as client:
+                response = await client.request(method, url, timeout=timeout, **kwargs)
+        except httpx.HTTPError as exc:
+            self.breaker.record_failure()
+            raise CatalogUnavailable(str(exc)) from exc
+        self._record_status(response.status_code)
+        return response
+
+
+def make_async_http_client():
+    """
+    Crea un cliente httpx para usar con ``async with``.
+
+    No se comparte entre llamadas: bajo WSGI cada vista asíncrona corre en un
+    event loop nuevo y un cliente guardado por loop nunca se cerraría.
+    """
+    if httpx is None:
+        raise ImproperlyConfigured("Las vistas asíncronas de productos requieren httpx (pip install httpx)")
+    config = getattr(settings, 'PLATZI_CATALOG', {})
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.get('ASYNC_MAX_CONNECTIONS', 100),
+            max_keepalive_connections=config.get('ASYNC_MAX_KEEPALIVE', 20),
+        ),
+    )
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def build_backend(config):
+    """Construye el backend de caché indicado en settings.PLATZI_CATALOG"""
+    backend = config.get('BACKEND', 'lru')
+    if backend == 'lru':
+        return LRUCacheBackend(max_entries=config.get('MAX_ENTRIES', 512))
+    if backend == 'django':
+        return DjangoCacheBackend(alias=config.get('CACHE_ALIAS', 'default'))
+    raise ValueError(f"Backend de caché desconocido: {backend!r}")
+
+
+def get_catalog():
+    """Devuelve el cliente compartido del catálogo, creándolo si hace falta"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                config = getattr(settings, 'PLATZI_CATALOG', {})
+                _catalog = CatalogClient(
+                    base_url=settings.PLATZI_API_BASE_URL + 'products',
+                    backend=build_backend(config),
+                    ttl=config.get('TTL', 60),
+                    stale_ttl=config.get('STALE_TTL', 300),
+                    negative_ttl=config.get('NEGATIVE_TTL', 30),
+                    stale_if_error_ttl=config.get('STALE_IF_ERROR_TTL', 3600),
+                    timeout=(
+                        config.get('CONNECT_TIMEOUT', 3.05),
+                        config.get('READ_TIMEOUT', getattr(settings, 'API_TIMEOUT', 10)),
+                    ),
+                    session=build_session(
+                        pool_connections=config.get('POOL_CONNECTIONS', 4),
+                        pool_maxsize=config.get('POOL_MAXSIZE', 20),
+                        retries=config.get('RETRIES', 2),
+                        backoff_factor=config.get('BACKOFF_FACTOR', 0.3),
+                        backoff_jitter=config.get('BACKOFF_JITTER', 0.3),
+                    ),
+                    breaker=CircuitBreaker(
+                        failure_threshold=config.get('BREAKER_FAILURE_THRESHOLD', 5),
+                        reset_timeout=config.get('BREAKER_RESET_TIMEOUT', 30),
+                    ),
+                )
+    return _catalog
+
+
+def mirror_enabled():
+    """Indica si las vistas deben servir el catálogo desde la réplica local"""
+    return getattr(settings, 'PLATZI_CATALOG', {}).get('SOURCE') == 'mirror'
+
+
+def reset_catalog():
+    """Olvida el cliente compartido (útil en pruebas o al cambiar settings)"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
@@ -0,0 +1,13 @@
+from .page_cache import CSRF_SENTINEL, SENTINEL_ATTR
+
+
+def page_cache_csrf(request):
+    """
+    Reemplaza el token CSRF por un marcador en las páginas que se van a cachear.
+
+    Los procesadores configurados corren después del de CSRF de Django, así
+    que este valor de ``csrf_token`` tiene prioridad.
+    """
+    if getattr(request, SENTINEL_ATTR, False):
+        return {'csrf_token': CSRF_SENTINEL}
+    return {}
@@ -0,0 +1,127 @@
+"""
+Conteos por categoría (CategoryFacet) mantenidos de forma incremental.
+
+Cada producto aporta +1 a ``local_count`` y/o ``api_count`` de su categoría
+según su origen (las mismas reglas que usan las secciones de product_list).
+Al guardar o borrar un producto solo se aplican las diferencias, y
+sync_catalog hace lo mismo con los lotes que escribe con ``bulk_create``.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+
+from .models import CategoryFacet, Product, category_key_for
+
+API_ORIGINS = (Product.ORIGIN_MIRROR, Product.ORIGIN_API_COPY)
+
+
+def facet_contribution(category, origin, api_id):
+    """``(clave, nombre, local, api)`` con lo que aporta un producto a los conteos"""
+    is_local = origin != Product.ORIGIN_MIRROR
+    is_api = api_id is not None and origin in API_ORIGINS
+    return category_key_for(category), (category or '').strip(), int(is_local), int(is_api)
+
+
+class FacetDeltas:
+    """Acumula diferencias de conteo por categoría para aplicarlas de una vez"""
+
+    def __init__(self):
+        self.names = {}
+        self.counts = defaultdict(lambda: [0, 0])
+
+    def add(self, category, origin, api_id, sign=1):
+        key, name, local, api = facet_contribution(category, origin, api_id)
+        if sign > 0:
+            self.names[key] = name
+        self.counts[key][0] += sign * local
+        self.counts[key][1] += sign * api
+
+    def remove(self, category, origin, api_id):
+        self.add(category, origin, api_id, sign=-1)
+
+    def apply(self):
+        """Aplica las diferencias con UPDATE ... SET n = n + delta"""
+        with transaction.atomic():
+            for key, (local, api) in self.counts.items():
+                name = self.names.get(key)
+                facet = CategoryFacet.objects.filter(pk=key)
+                if not local and not api:
+                    # Sin cambio de conteo: a lo sumo se actualiza el nombre mostrado
+                    if name:
+                        facet.exclude(name=name).update(name=name)
+                    continue
+                changes = {'local_count': F('local_count') + local, 'api_count': F('api_count') + api}
+                if name:
+                    changes['name'] = name
+                if not facet.update(**changes):
+                    CategoryFacet.objects.get_or_create(key=key, defaults={'name': name or key})
+                    facet.update(**changes)
+        self.counts.clear()
+        self.names.clear()
+
+
+_deferred = ContextVar('deferred_facet_deltas', default=None)
+
+
+@contextmanager
+def deferred_facet_updates():
+    """
+    Agrupa los cambios de conteo de las señales dentro del bloque.
+
+    Útil al borrar o guardar muchos productos: en lugar de un UPDATE por
+    producto se aplica un UPDATE por categoría al terminar el bloque.
+    """
+    if _deferred.get() is not None:
+        # Ya hay un bloque activo: sus cambios se aplican al cerrarlo
+        yield _deferred.get()
+        return
+    deltas = FacetDeltas()
+    token = _deferred.set(deltas)
+    try:
+        yield deltas
+    finally:
+        _deferred.reset(token)
+    deltas.apply()
+
+
+def record_facet_change(previous=None, current=None):
+    """Registra el cambio de un producto (tuplas categoría, origen, api_id) y lo aplica"""
+    deltas = _deferred.get() or FacetDeltas()
+    if previous is not None:
+        deltas.remove(*previous)
+    if current is not None:
+        deltas.add(*current)
+    if _deferred.get() is None:
+        deltas.apply()
+
+
+def rebuild_category_facets():
+    """Recalcula todos los conteos desde la tabla de productos (para corregir desvíos)"""
+    rows = (
+        Product.objects.order_by().values('category_key')
+        .annotate(
+            name=Max('category'),
+            local_count=Count('pk', filter=~Q(origin=Product.ORIGIN_MIRROR)),
+            api_count=Count('pk', filter=Q(api_id__isnull=False, origin__in=API_ORIGINS)),
+        )
+    )
+    facets = [
+        CategoryFacet(key=row['category_key'], name=row['name'].strip(),
+                      local_count=row['local_count'], api_count=row['api_count'])
+        for row in rows
+    ]
+    with transaction.atomic():
+        CategoryFacet.objects.all().delete()
+        CategoryFacet.objects.bulk_create(facets)
+    return len(facets)
+
+
+def category_counts(field):
+    """``{nombre: conteo}`` de las categorías con productos en ``local_count`` o ``api_count``"""
+    return dict(
+        CategoryFacet.objects.exclude(key='').filter(**{f'{field}__gt': 0})
+        .values_list('name', field)
+    )
@@ -0,0 +1,261 @@
+"""
+Cola write-behind de operaciones contra la API de Platzi.
+
+Las vistas ya no esperan a la API: guardan el producto local y un
+UpstreamJob en la misma transacción (un INSERT cada uno) y responden. El
+comando ``process_upstream_jobs`` reserva trabajos por lotes, los ejecuta y
+reintenta los fallos transitorios con backoff exponencial y jitter. Cada
+trabajo lleva una clave de idempotencia que se envía a la API, así que un
+reintento tras una respuesta perdida no debería duplicar el producto.
+
+Varios workers pueden correr a la vez: la reserva es un UPDATE condicional
+que solo gana uno de ellos, y una reserva vencida (worker caído) se retoma.
+Dentro de un lote, las llamadas HTTP se hacen en paralelo (hasta
+``CONCURRENCY`` a la vez); los resultados se guardan desde el hilo principal.
+"""
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog import CatalogError, CatalogUnavailable
+from .facets import deferred_facet_updates
+from .models import Product, UpstreamJob
+from .page_cache import bump_page_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'BATCH_SIZE': 20,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF_BASE': 5,
+    'BACKOFF_MAX': 600,
+    'LEASE': 60,
+    'CONCURRENCY': 8,
+}
+
+
+def jobs_config():
+    return {**DEFAULT_CONFIG, **getattr(settings, 'UPSTREAM_JOBS', {})}
+
+
+def queue_product_creation(product, payload):
+    """
+    Guarda ``product`` como pendiente de publicar y encola su alta en la API.
+
+    Devuelve el UpstreamJob creado.
+    """
+    with transaction.atomic():
+        product.sync_status = Product.SYNC_PENDING
+        product.save()
+        return UpstreamJob.objects.create(
+            kind=UpstreamJob.KIND_CREATE,
+            product=product,
+            payload=payload,
+            idempotency_key=uuid.uuid4().hex,
+        )
+
+
+def queue_deletions(product_ids=(), api_ids=()):
+    """
+    Borra productos locales y encola el borrado en la API de los que existen allí.
+
+    ``product_ids`` son ids locales; ``api_ids`` son ids de la API (se borra
+    también su copia o réplica local). Los productos creados aquí y aún no
+    publicados cancelan su alta pendiente. Las copias editadas (api_copy)
+    borradas por id local solo descartan la edición.
+
+    Devuelve ``(lote, productos borrados, ids de la API encolados)``.
+    """
+    batch = uuid.uuid4().hex
+    api_ids = {int(api_id) for api_id in api_ids}
+    local = Product.objects.filter(pk__in=list(product_ids))
+    # Los productos publicados desde aquí también se borran de la API
+    api_ids.update(
+        local.filter(origin=Product.ORIGIN_LOCAL, api_id__isnull=False).values_list('api_id', flat=True)
+    )
+    doomed = Product.objects.filter(pk__in=list(product_ids)) | Product.objects.filter(api_id__in=api_ids)
+
+    with transaction.atomic():
+        UpstreamJob.objects.filter(
+            kind=UpstreamJob.KIND_CREATE, product__in=doomed, status=UpstreamJob.STATUS_PENDING,
+        ).update(status=UpstreamJob.STATUS_CANCELLED, last_error='Producto eliminado antes de publicarse')
+        with deferred_facet_updates():
+            deleted = doomed.delete()[1].get(Product._meta.label, 0)
+        UpstreamJob.objects.bulk_create([
+            UpstreamJob(
+                kind=UpstreamJob.KIND_DELETE,
+                payload={'api_id': api_id},
+                idempotency_key=uuid.uuid4().hex,
+                batch=batch,
+            )
+            for api_id in sorted(api_ids)
+        ])
+    return batch, deleted, sorted(api_ids)
+
+
+def batch_report(batch):
+    """Estado por producto de un borrado masivo"""
+    jobs = UpstreamJob.objects.filter(batch=batch).order_by('id')
+    results = [
+        {
+            'api_id': job.payload.get('api_id'),
+            'status': job.status,
+            'attempts': job.attempts,
+            'error': job.last_error,
+            'result': job.result,
+        }
+        for job in jobs
+    ]
+    finished = {UpstreamJob.STATUS_DONE, UpstreamJob.STATUS_FAILED, UpstreamJob.STATUS_CANCELLED}
+    return {
+        'batch': batch,
+        'total': len(results),
+        'pending': sum(1 for result in results if result['status'] not in finished),
+        'results': results,
+    }
+
+
+def claim_jobs(batch_size, lease):
+    """Reserva hasta ``batch_size`` trabajos listos para este worker"""
+    now = timezone.now()
+    ready = UpstreamJob.objects.filter(
+        status__in=[UpstreamJob.STATUS_PENDING, UpstreamJob.STATUS_RUNNING],
+        next_attempt_at__lte=now,
+    )
+    ids = list(ready.order_by('next_attempt_at', 'id').values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Solo se reservan los que siguen listos: si otro worker ganó, su next_attempt_at ya es futuro
+    ready.filter(pk__in=ids).update(
+        status=UpstreamJob.STATUS_RUNNING,
+        claimed_by=token,
+        next_attempt_at=now + timedelta(seconds=lease),
+        updated_at=now,
+    )
+    return list(
+        UpstreamJob.objects.filter(claimed_by=token, status=UpstreamJob.STATUS_RUNNING)
+        .select_related('product')
+    )
+
+
+def process_jobs(client, batch_size=None, concurrency=None):
+    """Reserva y ejecuta un lote de trabajos; devuelve estadísticas"""
+    config = jobs_config()
+    jobs = claim_jobs(batch_size or config['BATCH_SIZE'], config['LEASE'])
+    stats = {'claimed': len(jobs), 'done': 0, 'retried': 0, 'failed': 0}
+    if not jobs:
+        return stats
+
+    workers = min(concurrency or config['CONCURRENCY'], len(jobs))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upstream-job') as pool:
+        # Los hilos solo hablan con la API; la base de datos se toca desde este hilo
+        outcomes = pool.map(lambda job: call_upstream(job, client), jobs)
+        for job, (response, error) in zip(jobs, outcomes):
+            stats[finish_job(job, response, error, config)] += 1
+    return stats
+
+
+def call_upstream(job, client):
+    """Hace la llamada HTTP del trabajo; devuelve ``(respuesta, error)``"""
+    try:
+        return UPSTREAM_CALLS[job.kind](job, client), None
+    except CatalogError as exc:
+        return None, exc
+
+
+def finish_job(job, response, error, config=None):
+    """Guarda el resultado de un trabajo; devuelve 'done', 'retried' o 'failed'"""
+    config = config or jobs_config()
+    job.attempts += 1
+    if error is not None:
+        return _record_failure(job, error, config)
+
+    with transaction.atomic():
+        job.result = JOB_FINISHERS[job.kind](job, response)
+        job.status = UpstreamJob.STATUS_DONE
+        job.last_error = ''
+        job.save(update_fields=['status', 'result', 'attempts', 'last_error', 'updated_at'])
+    return 'done'
+
+
+def is_retryable(exc):
+    """Errores transitorios: sin conexión, circuito abierto, 5xx o 429"""
+    if isinstance(exc, CatalogUnavailable) or exc.status_code is None:
+        return True
+    return exc.status_code >= 500 or exc.status_code == 429
+
+
+def backoff_delay(attempts, config):
+    """Segundos hasta el próximo intento: exponencial con jitter, con tope"""
+    delay = min(config['BACKOFF_BASE'] * 2 ** (attempts - 1), config['BACKOFF_MAX'])
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _record_failure(job, exc, config):
+    job.last_error = str(exc)
+    if is_retryable(exc) and job.attempts < config['MAX_ATTEMPTS']:
+        job.status = UpstreamJob.STATUS_PENDING
+        job.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts, config))
+        job.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'updated_at'])
+        return 'retried'
+
+    logger.warning("Trabajo %s fallido tras %s intentos: %s", job, job.attempts, exc)
+    with transaction.atomic():
+        job.status = UpstreamJob.STATUS_FAILED
+        job.save(update_fields=['status', 'attempts', 'last_error', 'updated_at'])
+        if job.kind == UpstreamJob.KIND_CREATE and job.product_id:
+            Product.objects.filter(pk=job.product_id).update(sync_status=Product.SYNC_FAILED)
+            bump_page_version()
+    return 'failed'
+
+
+def _call_create(job, client):
+    return client.create_product(job.payload, idempotency_key=job.idempotency_key)
+
+
+def _finish_create(job, created):
+    api_id = created['id']
+    # Si sync_catalog ya replicó el producto nuevo, la fila local lo reemplaza
+    Product.objects.filter(api_id=api_id, origin=Product.ORIGIN_MIRROR).delete()
+    published = Product.objects.filter(pk=job.product_id).update(
+        api_id=api_id, sync_status=Product.SYNC_SYNCED, updated_at=timezone.now(),
+    ) if job.product_id else 0
+    # update() no envía post_save
+    bump_page_version()
+    if not published:
+        # El producto se borró mientras se publicaba: también se borra de la API
+        queue_deletions(api_ids=[api_id])
+    return {'api_id': api_id}
+
+
+def _call_delete(job, client):
+    api_id = job.payload['api_id']
+    try:
+        client.delete_product(api_id)
+    except CatalogError as exc:
+        if exc.status_code == 404:
+            return {'api_id': api_id, 'deleted': False}  # Ya no existía en la API
+        raise
+    return {'api_id': api_id, 'deleted': True}
+
+
+def _finish_delete(job, result):
+    return result
+
+
+UPSTREAM_CALLS = {
+    UpstreamJob.KIND_CREATE: _call_create,
+    UpstreamJob.KIND_DELETE: _call_delete,
+}
+
+JOB_FINISHERS = {
+    UpstreamJob.KIND_CREATE: _finish_create,
+    UpstreamJob.KIND_DELETE: _finish_delete,
+}
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from platzi_store.database import SQLITE_PRODUCTION_PRAGMAS
+
+SCHEMA = """
+CREATE TABLE product (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(200) NOT NULL,
+    price NUMERIC NOT NULL,
+    category_key VARCHAR(100) NOT NULL,
+    created_at DATETIME NOT NULL
+);
+CREATE INDEX product_category_created_idx ON product (category_key, created_at DESC, id);
+"""
+CATEGORIES = ['clothes', 'electronics', 'furniture', 'shoes', 'others']
+READ_SQL = ("SELECT id, title, price FROM product WHERE category_key = ? "
+            "ORDER BY created_at DESC, id LIMIT 13")
+WRITE_SQL = "INSERT INTO product (title, price, category_key, created_at) VALUES (?, ?, ?, ?)"
+
+
+class Profile:
+    """Cómo abre y configura sus conexiones cada perfil de settings"""
+
+    def __init__(self, name, pragmas, persistent):
+        self.name = name
+        self.pragmas = pragmas
+        self.persistent = persistent
+
+    def connect(self, path):
+        # Igual que Django: timeout por defecto de sqlite3 salvo que el perfil fije busy_timeout
+        connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name}={value}')
+        return connection
+
+
+PROFILES = [
+    # Sin ajustes: journal de rollback, synchronous=FULL y una conexión por petición (CONN_MAX_AGE=0)
+    Profile('default', {}, persistent=False),
+    # DB_PROFILE=production
+    Profile('production', SQLITE_PRODUCTION_PRAGMAS, persistent=True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Mide lecturas y escrituras concurrentes en SQLite con el perfil por defecto y el de producción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Hilos que leen páginas de productos')
+        parser.add_argument('--writers', type=int, default=1, help='Hilos que insertan productos')
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duración de cada medición')
+        parser.add_argument('--rows', type=int, default=20000, help='Productos iniciales')
+
+    def handle(self, *args, **options):
+        for profile in PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.seed(profile, path, options['rows'])
+                stats = self.run(profile, path, options)
+            self.stdout.write(self.style.SUCCESS(
+                f"{profile.name:>10}: {stats['reads'] / options['seconds']:.0f} lecturas/s, "
+                f"{stats['writes'] / options['seconds']:.0f} escrituras/s, "
+                f"{stats['errors']} errores 'database is locked'"
+            ))
+
+    def seed(self, profile, path, rows):
+        connection = profile.connect(path)
+        connection.executescript(SCHEMA)
+        connection.execute('BEGIN')
+        connection.executemany(WRITE_SQL, (
+            (f'Producto {i}', i % 500, CATEGORIES[i % len(CATEGORIES)], f'2025-01-01 00:00:{i % 60:02d}')
+            for i in range(rows)
+        ))
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, profile, path, options):
+        stats = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def worker(operation):
+            connection = profile.connect(path) if profile.persistent else None
+            done = errors = 0
+            while time.monotonic() < deadline:
+                current = connection or profile.connect(path)
+                try:
+                    operation(current, done)
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if current.in_transaction:
+                        current.execute('ROLLBACK')
+                finally:
+                    if connection is None:
+                        current.close()
+            if connection is not None:
+                connection.close()
+            return done, errors
+
+        def read(connection, i):
+            connection.execute(READ_SQL, (CATEGORIES[i % len(CATEGORIES)],)).fetchall()
+
+        def write(connection, i):
+            # Transacción corta como la de un save() del ORM
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(WRITE_SQL, (f'Nuevo {i}', i, CATEGORIES[i % len(CATEGORIES)],
+                                           '2026-01-01 00:00:00'))
+            connection.execute('COMMIT')
+
+        def run_worker(kind, operation):
+            done, errors = worker(operation)
+            with lock:
+                stats[kind] += done
+                stats['errors'] += errors
+
+        threads = (
+            [threading.Thread(target=run_worker, args=('reads', read)) for _ in range(options['readers'])]
+            + [threading.Thread(target=run_worker, args=('writes', write)) for _ in range(options['writers'])]
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template import Engine
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from platzi_store.templating import django_engine, template_names
+from products.testing import make_api_product
+
+# Contexto mínimo para que las páginas de producto rendericen algo representativo
+SAMPLE_CONTEXT = {
+    'product': make_api_product(1),
+    'api_products': [dict(make_api_product(i), has_local_copy=False) for i in range(1, 25)],
+    'current_category': 'all',
+    'card_cache_timeout': 0,
+}
+
+
+class Command(BaseCommand):
+    help = 'Mide por plantilla el tiempo de compilarla sin caché y de renderizarla con el loader cacheado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Repeticiones por plantilla')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        engine = django_engine()
+        # Mismo motor pero sin loader cacheado: lo que costaba cada render antes
+        uncached = Engine(
+            dirs=engine.dirs, libraries=engine.libraries,
+            builtins=[], debug=engine.debug, loaders=[
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        self.stdout.write(f"{'plantilla':<32} {'compilar (sin caché)':>22} {'render (cacheado)':>20}")
+        for name in template_names():
+            compile_ms = self.measure(lambda: uncached.get_template(name), iterations)
+            try:
+                render_to_string(name, SAMPLE_CONTEXT, request=request)
+            except Exception as exc:
+                render = f'error: {type(exc).__name__}'
+            else:
+                render = '{:.2f} ms'.format(self.measure(
+                    lambda: render_to_string(name, SAMPLE_CONTEXT, request=request), iterations))
+            compile_text = f'{compile_ms:.2f} ms' if compile_ms is not None else 'no compila'
+            self.stdout.write(f'{name:<32} {compile_text:>22} {render:>20}')
+
+    def measure(self, function, iterations):
+        """Milisegundos promedio por llamada, o None si la llamada falla"""
+        try:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                function()
+        except Exception:
+            return None
+        return (time.perf_counter() - start) / iterations * 1000
@@ -0,0 +1,162 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+
+from products.catalog import reset_catalog
+from products.facets import rebuild_category_facets
+from products.models import Product
+from products.testing import FakePlatziAPI, make_api_product
+
+CATEGORIES = ['Clothes', 'Electronics', 'Furniture', 'Shoes', 'Others']
+UPSTREAM_PRODUCTS = 50
+PASSWORD = 'bench-password-123'
+CREATE_FORM = {
+    'title': 'Producto bench', 'price': '10', 'description': 'Creado por bench_views',
+    'category': '1', 'image': 'https://img.test/bench.png',
+}
+
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano de una lista ordenada"""
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = ('Mide latencia (p50/p95/p99), consultas y memoria asignada por petición de las vistas '
+            'de productos y cuentas, con N productos y una API de Platzi falsa; imprime JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000',
+                            help='Cantidades de productos locales separadas por comas (p. ej. 1000,10000,100000)')
+        parser.add_argument('--iterations', type=int, default=30, help='Peticiones medidas por escenario')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Segundos de latencia de la API falsa de Platzi')
+        parser.add_argument('--output', help='Archivo donde guardar el JSON (por defecto, la salida estándar)')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.iterations = options['iterations']
+
+        # Base de datos de prueba aparte: la base de desarrollo no se toca
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            upstream = [make_api_product(i, category=CATEGORIES[i % len(CATEGORIES)])
+                        for i in range(1, UPSTREAM_PRODUCTS + 1)]
+            with FakePlatziAPI(upstream, latency=options['latency']) as api, \
+                    override_settings(PLATZI_API_BASE_URL=api.url.removesuffix('products')):
+                self.api = api
+                User.objects.create_user(username='bench', password=PASSWORD)
+                results = []
+                for size in sizes:
+                    self.seed(size)
+                    results.extend(self.run_scenarios(size))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = json.dumps({
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': self.iterations,
+                'upstream_latency': options['latency'],
+            },
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+            self.stderr.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+        else:
+            self.stdout.write(report)
+
+    def seed(self, size):
+        Product.objects.all().delete()
+        batch = 5000
+        for start in range(0, size, batch):
+            Product.objects.bulk_create([
+                Product(title=f'Producto {i}', price=i % 500, description=f'Descripción del producto {i}',
+                        category=CATEGORIES[i % len(CATEGORIES)], image='https://img.test/p.png')
+                for i in range(start, min(size, start + batch))
+            ])
+        rebuild_category_facets()
+
+    def scenarios(self):
+        """Nombre, cliente y función que hace una petición"""
+        user_client = Client()
+        user_client.login(username='bench', password=PASSWORD)
+        anonymous = Client()
+
+        def login():
+            client = Client()
+            return client.post('/login/', {'username': 'bench', 'password': PASSWORD})
+
+        return [
+            ('product_list_all', lambda: user_client.get('/')),
+            ('product_list_filtered', lambda: user_client.get('/', {'category': 'Clothes'})),
+            ('product_list_anonymous', lambda: anonymous.get('/')),
+            ('product_detail', lambda: user_client.get('/product/1/')),
+            ('create_product', lambda: user_client.post('/create/', CREATE_FORM)),
+            ('login_view', login),
+            ('dashboard', lambda: user_client.get('/dashboard/')),
+        ]
+
+    def run_scenarios(self, size):
+        results = []
+        for name, request in self.scenarios():
+            cache.clear()
+            reset_catalog()
+            upstream_before = len(self.api.requests)
+            status = request().status_code  # Primera petición: llena cachés, no se mide
+
+            durations, queries = [], []
+            for _ in range(self.iterations):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    request()
+                    durations.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured))
+
+            # Memoria en una pasada aparte: tracemalloc distorsiona los tiempos
+            allocations = []
+            tracemalloc.start()
+            for _ in range(min(self.iterations, 10)):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                request()
+                allocations.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+            tracemalloc.stop()
+
+            durations.sort()
+            results.append({
+                'products': size,
+                'scenario': name,
+                'status': status,
+                'p50_ms': round(percentile(durations, 0.50), 3),
+                'p95_ms': round(percentile(durations, 0.95), 3),
+                'p99_ms': round(percentile(durations, 0.99), 3),
+                'mean_ms': round(statistics.fmean(durations), 3),
+                'queries_mean': round(statistics.fmean(queries), 2),
+                'queries_max': max(queries),
+                'alloc_peak_kb_mean': round(statistics.fmean(allocations), 1),
+                'upstream_requests': len(self.api.requests) - upstream_before,
+            })
+            self.stderr.write(f"{size} productos, {name}: p50 {results[-1]['p50_ms']} ms")
+        return results
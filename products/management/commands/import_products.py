@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk import IMPORT_FORMATS, ImportFormatError, format_for_filename, import_products
+
+
+class Command(BaseCommand):
+    help = 'Importa productos locales desde un archivo CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo a importar')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Filas por bulk_create y por transacción')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or format_for_filename(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                stats = import_products(stream, file_format, batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f'No se pudo abrir el archivo: {exc}')
+        except (ImportFormatError, UnicodeDecodeError) as exc:
+            raise CommandError(f'No se pudo leer el archivo: {exc}')
+
+        for error in stats['errors']:
+            self.stderr.write(f"Línea {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            '{imported} productos importados, {invalid} filas con errores'.format(**stats)
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.catalog import CatalogClient, get_catalog
+from products.jobs import process_jobs
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos pendientes contra la API de Platzi (altas de productos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='URL del endpoint de productos (por defecto la de settings)')
+        parser.add_argument('--batch-size', type=int, help='Trabajos reservados por vuelta')
+        parser.add_argument('--loop', action='store_true', help='Procesar la cola continuamente')
+        parser.add_argument('--interval', type=float, default=2,
+                            help='Segundos de espera con --loop cuando la cola está vacía')
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            client = CatalogClient(options['base_url'])
+        else:
+            client = get_catalog()
+
+        # Sin --loop se vacía la cola de trabajos listos y se termina
+        while True:
+            stats = process_jobs(client, batch_size=options['batch_size'])
+            if stats['claimed']:
+                self.stdout.write(
+                    '{claimed} trabajos: {done} completados, {retried} reintentarán, '
+                    '{failed} fallidos'.format(**stats)
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
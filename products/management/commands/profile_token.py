@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from platzi_store.profiling import make_profile_token, profiling_config
+
+
+class Command(BaseCommand):
+    help = 'Genera el token firmado que activa el perfilado de una petición (encabezado X-Profile)'
+
+    def handle(self, *args, **options):
+        config = profiling_config()
+        token = make_profile_token()
+        self.stdout.write(token)
+        self.stderr.write(
+            f"Válido por {config['TOKEN_MAX_AGE']} s. Ejemplo:\n"
+            f"  curl -H '{config['HEADER']}: {token}' -i http://127.0.0.1:8000/\n"
+            f"El perfil queda en {config['DIR']}"
+        )
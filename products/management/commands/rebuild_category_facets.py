@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.facets import rebuild_category_facets
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los conteos por categoría desde la tabla de productos'
+
+    def handle(self, *args, **options):
+        total = rebuild_category_facets()
+        self.stdout.write(self.style.SUCCESS(f'{total} categorías recalculadas'))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog import CatalogClient, CatalogError, get_catalog
+from products.sync import sync_catalog
+
+
+class Command(BaseCommand):
+    help = 'Replica el catálogo de la API de Platzi en la tabla local de productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='URL del endpoint de productos (por defecto la de settings)')
+        parser.add_argument('--page-size', type=int, default=100, help='Productos por página de la API')
+        parser.add_argument('--batch-size', type=int, default=500, help='Filas por bulk_create')
+        parser.add_argument('--no-prune', action='store_true',
+                            help='No eliminar réplicas que ya no existen en la API')
+        parser.add_argument('--loop', action='store_true', help='Sincronizar continuamente')
+        parser.add_argument('--interval', type=int, default=300,
+                            help='Segundos entre sincronizaciones con --loop')
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            client = CatalogClient(options['base_url'])
+        else:
+            client = get_catalog()
+
+        while True:
+            try:
+                stats = sync_catalog(
+                    client,
+                    page_size=options['page_size'],
+                    batch_size=options['batch_size'],
+                    prune=not options['no_prune'],
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    'Sincronizados {fetched} productos: {upserted} nuevos o modificados, '
+                    '{unchanged} sin cambios, {skipped} con copia local, {deleted} eliminados'.format(**stats)
+                ))
+            except CatalogError as exc:
+                if not options['loop']:
+                    raise CommandError(f'Error al sincronizar el catálogo: {exc}')
+                self.stderr.write(f'Error al sincronizar el catálogo: {exc}')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
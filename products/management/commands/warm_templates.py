@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from platzi_store.templating import template_names, warm_templates
+
+
+class Command(BaseCommand):
+    help = 'Compila todas las plantillas del proyecto (las deja en el loader cacheado) e informa errores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Incluir las plantillas de apps de terceros (admin, DRF...)')
+        parser.add_argument('--fail-on-error', action='store_true',
+                            help='Terminar con error si alguna plantilla no compila')
+
+    def handle(self, *args, **options):
+        results = warm_templates(template_names(include_third_party=options['all']))
+        failed = [(name, error) for name, _, error in results if error is not None]
+
+        for name, seconds, error in results:
+            if error is None:
+                self.stdout.write(f'{name}: {seconds * 1000:.2f} ms')
+            else:
+                self.stderr.write(f'{name}: {error}')
+
+        total = sum(seconds for _, seconds, _ in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results) - len(failed)} plantillas compiladas en {total * 1000:.1f} ms, '
+            f'{len(failed)} con errores'
+        ))
+        if failed and options['fail_on_error']:
+            raise CommandError(f'{len(failed)} plantillas no compilan')
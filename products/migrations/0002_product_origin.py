@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+def mark_api_copies(apps, schema_editor):
+    # Los productos existentes con api_id son copias editadas desde edit_api_product
+    Product = apps.get_model("products", "Product")
+    Product.objects.filter(api_id__isnull=False).update(origin="api_copy")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="api_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="origin",
+            field=models.CharField(
+                choices=[
+                    ("local", "Local"),
+                    ("api_copy", "Copia editada de la API"),
+                    ("mirror", "Réplica de la API"),
+                ],
+                default="local",
+                max_length=10,
+            ),
+        ),
+        migrations.RunPython(mark_api_copies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+
+def fill_category_keys(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    for product in Product.objects.only("id", "category").iterator(chunk_size=1000):
+        Product.objects.filter(pk=product.pk).update(
+            category_key=(product.category or "").strip().casefold()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_product_origin"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="category_key",
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_category_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["-created_at", "id"], name="product_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category_key", "-created_at", "id"],
+                name="product_category_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category_key", "api_id"], name="product_category_api_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def build_facets(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    CategoryFacet = apps.get_model("products", "CategoryFacet")
+    rows = (
+        Product.objects.order_by()
+        .values("category_key")
+        .annotate(
+            name=Max("category"),
+            local_count=Count("pk", filter=~Q(origin="mirror")),
+            api_count=Count(
+                "pk", filter=Q(api_id__isnull=False, origin__in=["mirror", "api_copy"])
+            ),
+        )
+    )
+    CategoryFacet.objects.bulk_create(
+        CategoryFacet(
+            key=row["category_key"],
+            name=row["name"].strip(),
+            local_count=row["local_count"],
+            api_count=row["api_count"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_category_key_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryFacet",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("local_count", models.IntegerField(default=0)),
+                ("api_count", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RunPython(build_facets, migrations.RunPython.noop),
+    ]
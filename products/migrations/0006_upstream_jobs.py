@@ -0,0 +1,91 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_search_fts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="sync_status",
+            field=models.CharField(
+                choices=[
+                    ("none", "Sin publicar"),
+                    ("pending", "Pendiente de publicar"),
+                    ("synced", "Publicado en la API"),
+                    ("failed", "Error al publicar"),
+                ],
+                default="none",
+                max_length=10,
+            ),
+        ),
+        migrations.CreateModel(
+            name="UpstreamJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("create", "Crear producto")], max_length=10
+                    ),
+                ),
+                ("payload", models.JSONField(default=dict)),
+                ("idempotency_key", models.CharField(max_length=64, unique=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pendiente"),
+                            ("running", "En curso"),
+                            ("done", "Completado"),
+                            ("failed", "Fallido"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("claimed_by", models.CharField(blank=True, max_length=32)),
+                ("last_error", models.TextField(blank=True)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="upstream_jobs",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["next_attempt_at", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="upstream_job_ready_idx",
+                    )
+                ],
+            },
+        ),
+    ]
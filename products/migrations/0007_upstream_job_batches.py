@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_upstream_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="upstreamjob",
+            name="batch",
+            field=models.CharField(blank=True, db_index=True, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name="upstreamjob",
+            name="kind",
+            field=models.CharField(
+                choices=[("create", "Crear producto"), ("delete", "Eliminar producto")],
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="upstreamjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pendiente"),
+                    ("running", "En curso"),
+                    ("done", "Completado"),
+                    ("failed", "Fallido"),
+                    ("cancelled", "Cancelado"),
+                ],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# En PostgreSQL no existe FTS5 y la búsqueda usa el respaldo con icontains,
+# que Django traduce a UPPER("columna"::text) LIKE UPPER('%palabra%'). Un
+# índice GIN trigram sobre esa misma expresión permite resolver el LIKE con
+# el índice en lugar de recorrer toda la tabla. En SQLite no hace nada.
+TRIGRAM_COLUMNS = ["title", "category", "description"]
+
+CREATE_TRIGRAM = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS product_{column}_trgm_idx ON products_product "
+    f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+    for column in TRIGRAM_COLUMNS
+]
+
+DROP_TRIGRAM = [
+    f"DROP INDEX IF EXISTS product_{column}_trgm_idx" for column in TRIGRAM_COLUMNS
+]
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_upstream_job_batches"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(CREATE_TRIGRAM), run_postgresql(DROP_TRIGRAM)),
+    ]
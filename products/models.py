@@ -1,17 +1,156 @@
 from django.db import models
+from django.utils import timezone
+
+
+def category_key_for(category):
+    """Clave normalizada de una categoría para búsquedas por igualdad (sin mayúsculas ni espacios)"""
+    return (category or '').strip().casefold()
+
 
 class Product(models.Model):
+    # Origen del registro
+    ORIGIN_LOCAL = 'local'        # Creado en esta tienda
+    ORIGIN_API_COPY = 'api_copy'  # Copia local editada de un producto de la API
+    ORIGIN_MIRROR = 'mirror'      # Réplica de la API mantenida por sync_catalog
+    ORIGIN_CHOICES = [
+        (ORIGIN_LOCAL, 'Local'),
+        (ORIGIN_API_COPY, 'Copia editada de la API'),
+        (ORIGIN_MIRROR, 'Réplica de la API'),
+    ]
+
+    # Publicación del producto en la API (ver jobs.py)
+    SYNC_NONE = 'none'        # No se publica (importado, réplica o anterior a la cola)
+    SYNC_PENDING = 'pending'  # En la cola de UpstreamJob
+    SYNC_SYNCED = 'synced'    # Publicado; api_id ya asignado
+    SYNC_FAILED = 'failed'    # La API lo rechazó o se agotaron los reintentos
+    SYNC_CHOICES = [
+        (SYNC_NONE, 'Sin publicar'),
+        (SYNC_PENDING, 'Pendiente de publicar'),
+        (SYNC_SYNCED, 'Publicado en la API'),
+        (SYNC_FAILED, 'Error al publicar'),
+    ]
+
     api_id = models.IntegerField(unique=True, null=True, blank=True)
+    origin = models.CharField(max_length=10, choices=ORIGIN_CHOICES, default=ORIGIN_LOCAL)
+    sync_status = models.CharField(max_length=10, choices=SYNC_CHOICES, default=SYNC_NONE)
     title = models.CharField(max_length=200)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     category = models.CharField(max_length=100)
+    category_key = models.CharField(max_length=100, blank=True, editable=False)
     image = models.URLField()
+    api_updated_at = models.DateTimeField(null=True, blank=True)  # updatedAt de la API
+    synced_at = models.DateTimeField(null=True, blank=True, editable=False)  # Última sync_catalog que lo vio
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.category_key = category_key_for(self.category)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'category_key'}
+        super().save(*args, **kwargs)
+
+    def as_api_dict(self):
+        """Representa el producto con la misma forma que devuelve la API de Platzi"""
+        return {
+            'id': self.api_id,
+            'title': self.title,
+            'price': self.price,
+            'description': self.description,
+            'category': {'name': self.category},
+            'images': [self.image] if self.image else [],
+            'creationAt': self.created_at,
+            'updatedAt': self.api_updated_at or self.updated_at,
+            'has_local_copy': self.origin == self.ORIGIN_API_COPY,
+            # Cambia al editar la copia local aunque updatedAt (de la API) no cambie
+            'localUpdatedAt': self.updated_at,
+        }
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Orden de la lista y de la paginación por cursor
+            models.Index(fields=['-created_at', 'id'], name='product_created_idx'),
+            # Filtro por categoría + mismo orden
+            models.Index(fields=['category_key', '-created_at', 'id'], name='product_category_created_idx'),
+            # Réplica de la API filtrada por categoría, ordenada por api_id
+            models.Index(fields=['category_key', 'api_id'], name='product_category_api_idx'),
+        ]
+
+
+class CategoryFacet(models.Model):
+    """
+    Conteo precalculado de productos por categoría.
+
+    Lo mantienen las señales de Product (ver signals.py) y sync_catalog, así
+    que la lista de categorías se lee sin recorrer la tabla de productos.
+    """
+    key = models.CharField(max_length=100, primary_key=True)  # category_key_for(name)
+    name = models.CharField(max_length=100)
+    local_count = models.IntegerField(default=0)  # Productos de la sección local
+    api_count = models.IntegerField(default=0)    # Réplicas y copias de productos de la API
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
+class UpstreamJob(models.Model):
+    """
+    Operación pendiente contra la API de Platzi (cola write-behind).
+
+    La vista guarda el producto y el trabajo en la misma transacción y
+    responde; el comando process_upstream_jobs ejecuta los trabajos con
+    reintentos y backoff.
+    """
+    KIND_CREATE = 'create'
+    KIND_DELETE = 'delete'
+    KIND_CHOICES = [
+        (KIND_CREATE, 'Crear producto'),
+        (KIND_DELETE, 'Eliminar producto'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En curso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_CANCELLED, 'Cancelado'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    product = models.ForeignKey(Product, null=True, blank=True, on_delete=models.SET_NULL,
+                                related_name='upstream_jobs')
+    payload = models.JSONField(default=dict)
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    batch = models.CharField(max_length=32, blank=True, db_index=True)  # Agrupa un borrado masivo
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Próximo intento; mientras está en curso, vencimiento de la reserva del worker
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            # Búsqueda de trabajos listos para ejecutar
+            models.Index(fields=['status', 'next_attempt_at'], name='upstream_job_ready_idx'),
+        ]
@@ -0,0 +1,146 @@
+"""
+Caché de páginas completas de product_list y product_detail para visitantes
+anónimos.
+
+Un acierto se sirve sin ORM, sin consultar la API y sin renderizar
+plantillas. Solo se cachean las peticiones GET sin cookie de sesión ni de
+mensajes: son visitantes anónimos y no tienen mensajes pendientes.
+
+El token CSRF cambia con cada visitante. Por eso la página se renderiza con
+``CSRF_SENTINEL`` en lugar del token (ver context_processors.py), y al
+responder el marcador se reemplaza por el token de quien pide la página.
+
+Cada llave incluye un número de versión. Cualquier cambio en los productos
+lo incrementa: señales de Product, sync_catalog, importaciones y trabajos
+de la API, o una respuesta nueva del catálogo. Así todas las páginas quedan
+invalidadas de una vez, sin tener que recorrer las llaves.
+"""
+import functools
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+
+VERSION_KEY = 'products:page_version'
+CSRF_SENTINEL = 'products-page-cache-csrf-token'
+# Atributo de la request que activa el marcador en context_processors.page_cache_csrf
+SENTINEL_ATTR = '_page_cache_csrf_sentinel'
+
+
+def page_cache_timeout():
+    return getattr(settings, 'PRODUCTS_PAGE_CACHE_TIMEOUT', 60)
+
+
+def page_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def _increment_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # La llave se perdió (reinicio o desalojo): cualquier valor nuevo sirve
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def bump_page_version(**kwargs):
+    """Invalida todas las páginas cacheadas (se puede conectar como receptor de señales)"""
+    _increment_version()
+    if transaction.get_connection().in_atomic_block:
+        # Una página renderizada antes del commit tendría los datos viejos
+        transaction.on_commit(_increment_version)
+
+
+def is_cacheable(request):
+    """Petición anónima, sin mensajes pendientes, que no cambia nada"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def page_key(request, view_name):
+    query = sorted(request.GET.lists())
+    digest = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return f"products:page:{page_version()}:{view_name}:{digest}"
+
+
+def with_csrf_token(request, content):
+    """Pone el token CSRF del visitante donde la página tiene el marcador"""
+    if CSRF_SENTINEL.encode() not in content:
+        return content
+    return content.replace(CSRF_SENTINEL.encode(), get_token(request).encode())
+
+
+def response_from_cache(request, entry):
+    content, content_type = entry
+    response = HttpResponse(with_csrf_token(request, content), content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def cache_entry(request, response):
+    """Contenido a guardar, o None si la respuesta no se puede compartir"""
+    messages = getattr(request, '_messages', None)
+    if response.status_code != 200 or response.streaming:
+        return None
+    if messages is not None and messages.added_new:
+        # La vista agregó un mensaje (p. ej. la API no respondió): es de este visitante
+        return None
+    return response.content, response['Content-Type']
+
+
+def anonymous_page_cache(view):
+    """Cachea la página completa de una vista (síncrona o asíncrona) para anónimos"""
+    view_name = view.__name__
+
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return await view(request, *args, **kwargs)
+            key = await sync_to_async(page_key)(request, view_name)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return response_from_cache(request, entry)
+            setattr(request, SENTINEL_ATTR, True)
+            response = await view(request, *args, **kwargs)
+            return await sync_to_async(store_response)(request, response, key)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable(request):
+            return view(request, *args, **kwargs)
+        key = page_key(request, view_name)
+        entry = cache.get(key)
+        if entry is not None:
+            return response_from_cache(request, entry)
+        setattr(request, SENTINEL_ATTR, True)
+        return store_response(request, view(request, *args, **kwargs), key)
+    return wrapper
+
+
+def store_response(request, response, key):
+    """Guarda la página recién renderizada y completa su token CSRF"""
+    entry = cache_entry(request, response)
+    if entry is not None:
+        cache.set(key, entry, page_cache_timeout())
+        response['X-Page-Cache'] = 'miss'
+        patch_vary_headers(response, ['Cookie'])
+    if not response.streaming:
+        response.content = with_csrf_token(request, response.content)
+    return response
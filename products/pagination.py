@@ -0,0 +1,119 @@
+"""
+Paginación por cursor (keyset) para las listas de productos.
+
+En lugar de OFFSET, cada página continúa desde los valores de orden de la
+última fila mostrada, así que el costo de una página no crece con el tamaño
+de la tabla. El cursor es un token opaco (base64 de JSON) que viaja en la URL.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import operator
+from collections import namedtuple
+from datetime import datetime
+from functools import reduce
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(values):
+    """Convierte los valores de orden de una fila en un cursor para la URL"""
+    raw = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Devuelve la lista de valores de un cursor, o None si no es válido"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPaginator:
+    """Pagina un QuerySet ordenado por ``ordering`` (p. ej. ``('-created_at', 'id')``)"""
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def queryset_for(self, queryset, cursor):
+        """QuerySet perezoso de la página, con una fila extra para saber si hay siguiente"""
+        queryset = queryset.order_by(*self.ordering)
+        values = self._cursor_values(queryset.model, cursor)
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+        return queryset[:self.page_size + 1]
+
+    def page(self, rows):
+        """Arma la página a partir de las filas obtenidas con queryset_for"""
+        rows = list(rows)
+        if len(rows) <= self.page_size:
+            return Page(rows, None)
+        rows = rows[:self.page_size]
+        last = rows[-1]
+        return Page(rows, encode_cursor([getattr(last, name) for name in self.fields]))
+
+    def paginate(self, queryset, cursor):
+        return self.page(self.queryset_for(queryset, cursor))
+
+    def _cursor_values(self, model, cursor):
+        values = decode_cursor(cursor)
+        if values is None or len(values) != len(self.fields):
+            return None
+        try:
+            return [model._meta.get_field(name).to_python(value)
+                    for name, value in zip(self.fields, values)]
+        except (ValidationError, ValueError, TypeError):
+            return None
+
+    def _after(self, values):
+        # (a, b) después de (x, y)  <=>  a > x  OR  (a = x AND b > y), según la dirección de cada campo
+        conditions = []
+        for index, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal_prefix = {self.fields[i]: values[i] for i in range(index)}
+            conditions.append(Q(**equal_prefix, **{f'{self.fields[index]}__{lookup}': values[index]}))
+        return reduce(operator.or_, conditions)
+
+
+def paginate_list(items, cursor, page_size, key='id'):
+    """
+    Pagina una lista en memoria (productos de la API) continuando después de ``key``.
+
+    Un cursor que no se puede leer o que apunta a un elemento que ya no está
+    (p. ej. un producto eliminado) devuelve una página vacía: volver a la
+    primera página mostraría productos repetidos.
+    """
+    start = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        if not values:
+            return Page([], None)
+        for index, item in enumerate(items):
+            if item.get(key) == values[0]:
+                start = index + 1
+                break
+        else:
+            return Page([], None)
+    page_items = items[start:start + page_size]
+    has_next = start + page_size < len(items)
+    next_cursor = encode_cursor([page_items[-1].get(key)]) if has_next and page_items else None
+    return Page(page_items, next_cursor)
+
+
+def cached_count(queryset, timeout=60):
+    """COUNT(*) cacheado por unos segundos: el total exacto no justifica contar en cada visita"""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    return cache.get_or_set(f"products:count:{digest}", queryset.count, timeout)
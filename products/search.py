@@ -0,0 +1,191 @@
+"""
+Búsqueda de texto completo sobre los productos.
+
+En SQLite usa la tabla FTS5 ``products_product_fts`` (ver la migración
+0005): ranking BM25 con más peso para el título y la categoría, búsqueda por
+prefijo ("cami" encuentra "camiseta") y fragmentos resaltados. En otros
+motores se recurre a ``icontains``; en PostgreSQL lo resuelven los índices
+trigram de la migración 0008, en el resto recorre toda la tabla.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import Product
+
+FTS_TABLE = 'products_product_fts'
+MAX_RESULTS = 50
+
+# Pesos BM25 de las columnas (title, description, category)
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Marcadores que SQLite inserta alrededor de las coincidencias; se
+# reemplazan por <mark> después de escapar el texto del producto
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+SNIPPET_TOKENS = 16
+
+SEARCH_SQL = f"""
+    SELECT p.*,
+           bm25({FTS_TABLE}, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score,
+           highlight({FTS_TABLE}, 0, %s, %s) AS title_match,
+           snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_TOKENS}) AS description_match
+    FROM {FTS_TABLE}
+    JOIN products_product AS p ON p.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH %s
+    ORDER BY score
+    LIMIT %s
+"""
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Triggers que mantienen el índice (los mismos que crea la migración 0005).
+# SQLite los borra junto con la tabla cuando una migración la reconstruye
+# para alterar columnas, por eso ensure_fts_triggers los repone tras migrar.
+FTS_TRIGGERS = {
+    'products_product_fts_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS products_product_fts_ai AFTER INSERT ON products_product BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description, category)
+            VALUES (new.id, new.title, new.description, new.category);
+        END
+    """,
+    'products_product_fts_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS products_product_fts_ad AFTER DELETE ON products_product BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, category)
+            VALUES ('delete', old.id, old.title, old.description, old.category);
+        END
+    """,
+    'products_product_fts_au': f"""
+        CREATE TRIGGER IF NOT EXISTS products_product_fts_au
+        AFTER UPDATE OF title, description, category ON products_product BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, category)
+            VALUES ('delete', old.id, old.title, old.description, old.category);
+            INSERT INTO {FTS_TABLE}(rowid, title, description, category)
+            VALUES (new.id, new.title, new.description, new.category);
+        END
+    """,
+}
+
+
+@dataclass
+class SearchResult:
+    product: Product
+    title: str     # HTML seguro con las coincidencias en <mark>
+    snippet: str   # Fragmento de la descripción, también resaltado
+    rank: float    # BM25 (más negativo = más relevante); 0 sin FTS
+
+    def as_dict(self):
+        product = self.product
+        return {
+            'id': product.pk,
+            'api_id': product.api_id,
+            'origin': product.origin,
+            'title': product.title,
+            'title_highlighted': self.title,
+            'snippet': self.snippet,
+            'category': product.category,
+            'price': str(product.price),
+            'image': product.image,
+            'rank': self.rank,
+        }
+
+
+_fts_tables = {}
+
+
+def fts_available():
+    """Indica si la base de datos tiene el índice FTS5 de productos (se consulta una vez)"""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[name]
+
+
+def ensure_fts_triggers(using='default'):
+    """
+    Repone los triggers del índice FTS5 si faltan y reconstruye el índice.
+
+    Se ejecuta después de cada ``migrate`` (ver apps.py); devuelve True si
+    tuvo que reponer algo.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'products_product'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in FTS_TRIGGERS if name not in existing]
+        if not missing or FTS_TABLE not in db.introspection.table_names(cursor):
+            return False
+        for name in missing:
+            cursor.execute(FTS_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def match_expression(query):
+    """
+    Convierte el texto del usuario en una expresión MATCH de FTS5.
+
+    Cada palabra se cita (para que no se interprete la sintaxis de FTS5, como
+    AND, NEAR o comillas) y se busca por prefijo; todas deben aparecer.
+    """
+    words = WORD_RE.findall(query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def render_highlight(text):
+    """Escapa el texto del producto y convierte los marcadores de SQLite en <mark>"""
+    html = escape(text or '')
+    html = html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+def search_products(query, limit=20):
+    """Devuelve hasta ``limit`` SearchResult ordenados por relevancia"""
+    limit = max(1, min(limit, MAX_RESULTS))
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if not fts_available():
+        return _search_with_icontains(WORD_RE.findall(query), limit)
+
+    rows = Product.objects.raw(SEARCH_SQL, [
+        HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, expression, limit,
+    ])
+    return [
+        SearchResult(
+            product=row,
+            title=render_highlight(row.title_match),
+            snippet=render_highlight(row.description_match),
+            rank=row.score,
+        )
+        for row in rows
+    ]
+
+
+def _search_with_icontains(words, limit):
+    products = Product.objects.all()
+    for word in words:
+        products = products.filter(
+            Q(title__icontains=word) | Q(description__icontains=word) | Q(category__icontains=word)
+        )
+    return [
+        SearchResult(
+            product=product,
+            title=escape(product.title),
+            snippet=escape(Truncator(product.description).words(SNIPPET_TOKENS)),
+            rank=0.0,
+        )
+        for product in products[:limit]
+    ]
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+from .models import Product
+
+
+class ProductSerializer(serializers.ModelSerializer):
+    """
+    Serializer de Product para la API REST.
+
+    No depende del request (no hay URLs absolutas ni campos por usuario), así
+    que su salida se puede cachear por fila (ver api.cached_representations).
+    """
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'api_id', 'origin', 'title', 'price', 'description', 'category', 'image',
+            'api_updated_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['api_id', 'origin', 'api_updated_at', 'created_at', 'updated_at']
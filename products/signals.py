@@ -0,0 +1,39 @@
+"""
+Señales de Product que mantienen los conteos de CategoryFacet y la versión
+de la caché de páginas.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .catalog import catalog_changed
+from .facets import record_facet_change
+from .models import Product
+from .page_cache import bump_page_version
+
+post_save.connect(bump_page_version, sender=Product, dispatch_uid='products_page_cache_save')
+post_delete.connect(bump_page_version, sender=Product, dispatch_uid='products_page_cache_delete')
+catalog_changed.connect(bump_page_version, dispatch_uid='products_page_cache_catalog')
+
+
+@receiver(pre_save, sender=Product)
+def remember_facet_state(sender, instance, **kwargs):
+    # Estado guardado antes del cambio, para restar su aporte en post_save
+    instance._facet_previous = None
+    if instance.pk is not None:
+        instance._facet_previous = (
+            Product.objects.filter(pk=instance.pk)
+            .values_list('category', 'origin', 'api_id').first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def update_facets_on_save(sender, instance, **kwargs):
+    record_facet_change(
+        previous=getattr(instance, '_facet_previous', None),
+        current=(instance.category, instance.origin, instance.api_id),
+    )
+
+
+@receiver(post_delete, sender=Product)
+def update_facets_on_delete(sender, instance, **kwargs):
+    record_facet_change(previous=(instance.category, instance.origin, instance.api_id))
@@ -0,0 +1,141 @@
+"""
+Sincronización del catálogo de la API de Platzi con la tabla local Product.
+
+Recorre la API por páginas, detecta qué productos cambiaron comparando su
+``updatedAt`` y los inserta o actualiza en lotes con ``bulk_create``
+(``update_conflicts=True`` sobre ``api_id``). Las copias editadas por los
+usuarios y los productos creados aquí nunca se sobrescriben.
+
+Las réplicas que ya no están en la API se borran con marcar y barrer: cada
+página sellada con la hora de inicio de la sincronización en ``synced_at``
+y, al terminar, se eliminan las réplicas con un sello anterior. Así el
+borrado no depende de cuántos productos tenga la API (una lista de ids en
+``NOT IN`` supera el límite de parámetros de SQLite con catálogos grandes).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .facets import FacetDeltas, deferred_facet_updates
+from .models import Product, category_key_for
+
+logger = logging.getLogger(__name__)
+
+# Campos que se actualizan cuando un producto de la API cambia
+MIRROR_UPDATE_FIELDS = [
+    'title', 'price', 'description', 'category', 'category_key', 'image',
+    'api_updated_at', 'updated_at',
+]
+
+# Si la API devuelve menos de esta fracción de las réplicas actuales no se
+# borra nada: más probable que sea una respuesta incompleta que un catálogo vaciado
+PRUNE_MIN_FETCHED_RATIO = 0.5
+
+
+def product_from_api(data):
+    """Construye un Product réplica (sin guardar) a partir de un producto de la API"""
+    images = data.get('images') or ['']
+    category = ((data.get('category') or {}).get('name') or '')[:100]
+    return Product(
+        api_id=data['id'],
+        origin=Product.ORIGIN_MIRROR,
+        title=(data.get('title') or '')[:200],
+        price=data.get('price') or 0,
+        description=data.get('description') or '',
+        category=category,
+        category_key=category_key_for(category),
+        image=images[0],
+        api_updated_at=parse_datetime(data.get('updatedAt') or ''),
+    )
+
+
+def sync_catalog(client, page_size=100, batch_size=500, prune=True):
+    """
+    Replica el catálogo completo de la API en Product.
+
+    Si la descarga falla a mitad de camino la excepción se propaga antes del
+    barrido, así que una sincronización interrumpida nunca borra réplicas.
+
+    Devuelve un diccionario con estadísticas de la sincronización.
+    """
+    stats = {'fetched': 0, 'upserted': 0, 'unchanged': 0, 'skipped': 0, 'deleted': 0}
+    # bulk_create no dispara señales: los conteos por categoría se ajustan aquí
+    facet_deltas = FacetDeltas()
+    mirrored_before = Product.objects.filter(origin=Product.ORIGIN_MIRROR).count()
+    started_at = timezone.now()
+    offset = 0
+
+    while True:
+        page = client.fetch_page(offset, page_size)
+        stats['fetched'] += len(page)
+
+        changed = _changed_products(page, stats, facet_deltas)
+        with transaction.atomic():
+            for start in range(0, len(changed), batch_size):
+                Product.objects.bulk_create(
+                    changed[start:start + batch_size],
+                    update_conflicts=True,
+                    unique_fields=['api_id'],
+                    update_fields=MIRROR_UPDATE_FIELDS,
+                )
+            facet_deltas.apply()
+            # Marca: las réplicas de esta página siguen existiendo en la API
+            Product.objects.filter(
+                origin=Product.ORIGIN_MIRROR, api_id__in=[item['id'] for item in page],
+            ).update(synced_at=started_at)
+        stats['upserted'] += len(changed)
+
+        if len(page) < page_size:
+            break
+        offset += page_size
+
+    if prune and stats['fetched'] < mirrored_before * PRUNE_MIN_FETCHED_RATIO:
+        logger.warning(
+            "No se eliminan réplicas: la API devolvió %s productos y hay %s replicados",
+            stats['fetched'], mirrored_before,
+        )
+    elif prune:
+        # Barrido: las réplicas que no se marcaron ya no existen en la API
+        # (delete() sí envía post_delete; los conteos se aplican una vez por categoría)
+        with deferred_facet_updates():
+            deleted, _ = (
+                Product.objects.filter(origin=Product.ORIGIN_MIRROR)
+                .filter(Q(synced_at__lt=started_at) | Q(synced_at__isnull=True))
+                .delete()
+            )
+        stats['deleted'] = deleted
+
+    client.invalidate()
+    logger.info("Catálogo sincronizado: %s", stats)
+    return stats
+
+
+def _changed_products(page, stats, facet_deltas):
+    """Filtra la página dejando solo los productos nuevos o modificados"""
+    existing = {
+        api_id: (origin, api_updated_at, category)
+        for api_id, origin, api_updated_at, category in Product.objects.filter(
+            api_id__in=[item['id'] for item in page]
+        ).values_list('api_id', 'origin', 'api_updated_at', 'category')
+    }
+
+    changed = []
+    for item in page:
+        product = product_from_api(item)
+        current = existing.get(product.api_id)
+        if current is None:
+            changed.append(product)
+            facet_deltas.add(product.category, product.origin, product.api_id)
+        elif current[0] != Product.ORIGIN_MIRROR:
+            # Copia editada o producto creado aquí: la versión local manda
+            stats['skipped'] += 1
+        elif current[1] is None or current[1] != product.api_updated_at:
+            changed.append(product)
+            facet_deltas.remove(current[2], Product.ORIGIN_MIRROR, product.api_id)
+            facet_deltas.add(product.category, product.origin, product.api_id)
+        else:
+            stats['unchanged'] += 1
+    return changed
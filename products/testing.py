@@ -0,0 +1,137 @@
+"""
+Servidor HTTP local que imita la API de productos de Platzi.
+
+Se usa en las pruebas y en los benchmarks para no depender de
+api.escuelajs.co. Soporta listado con ``offset``/``limit``, detalle,
+creación y eliminación, con una latencia artificial configurable.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_api_product(product_id, category='Clothes', updated_at='2025-01-01T00:00:00.000Z'):
+    """Producto con la misma forma que los de la API de Platzi"""
+    return {
+        'id': product_id,
+        'title': f'Producto {product_id}',
+        'price': 10 + product_id,
+        'description': f'Descripción del producto {product_id}',
+        'category': {'id': 1, 'name': category},
+        'images': [f'https://img.test/{product_id}.png'],
+        'creationAt': '2025-01-01T00:00:00.000Z',
+        'updatedAt': updated_at,
+    }
+
+
+class FakePlatziAPI:
+    """API falsa de Platzi escuchando en 127.0.0.1 en un puerto libre"""
+
+    def __init__(self, products=None, latency=0.0):
+        self.products = {product['id']: product for product in (products or [])}
+        self.latency = latency
+        self.requests = []
+        self.failures = 0            # Próximas peticiones que responden 503
+        self.idempotency_keys = {}   # Idempotency-Key -> id del producto creado
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/v1/products"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload=None):
+                body = json.dumps(payload).encode() if payload is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _product_id(self, path):
+                tail = path.rstrip('/').rsplit('/', 1)[-1]
+                return int(tail) if tail.isdigit() else None
+
+            def _begin(self):
+                with api._lock:
+                    api.requests.append((self.command, self.path))
+                if api.latency:
+                    time.sleep(api.latency)
+                with api._lock:
+                    failing = api.failures > 0
+                    api.failures = max(api.failures - 1, 0)
+                if failing:
+                    self._send(503, {'message': 'Service unavailable'})
+                    return None
+                return urlparse(self.path)
+
+            def do_GET(self):
+                url = self._begin()
+                if url is None:
+                    return
+                product_id = self._product_id(url.path)
+                with api._lock:
+                    if product_id is not None:
+                        product = api.products.get(product_id)
+                        return self._send(200, product) if product else self._send(404, {'message': 'Not found'})
+                    query = parse_qs(url.query)
+                    offset = int(query.get('offset', ['0'])[0])
+                    products = [api.products[key] for key in sorted(api.products)]
+                    if 'limit' in query:
+                        products = products[offset:offset + int(query['limit'][0])]
+                return self._send(200, products)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                data = json.loads(self.rfile.read(length) or b'{}')
+                if self._begin() is None:
+                    return
+                key = self.headers.get('Idempotency-Key')
+                with api._lock:
+                    if key in api.idempotency_keys:
+                        return self._send(201, api.products[api.idempotency_keys[key]])
+                    product_id = max(api.products, default=0) + 1
+                    if key:
+                        api.idempotency_keys[key] = product_id
+                    product = make_api_product(product_id)
+                    product.update({key: value for key, value in data.items() if key in product})
+                    api.products[product_id] = product
+                return self._send(201, product)
+
+            def do_DELETE(self):
+                url = self._begin()
+                if url is None:
+                    return
+                with api._lock:
+                    removed = api.products.pop(self._product_id(url.path), None)
+                return self._send(200, True) if removed else self._send(404, {'message': 'Not found'})
+
+        return Handler
@@ -1,3 +1,928 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from platzi_store.database import (
+    READ_REPLICA_ALIAS, SQLITE_PRODUCTION_PRAGMAS, ReadReplicaRouter, read_replica,
+    sqlite_init_command,
+)
+from platzi_store.middleware import QueryBudgetExceeded, QueryBudgetMiddleware, QueryStats, query_budget
+from platzi_store.profiling import make_profile_token, prune_profiles
+from platzi_store.templating import django_engine, template_names, warm_templates
+
+from .api import BULK_DELETE_MAX_IDS
+from .bulk import import_products
+from .catalog import (
+    CatalogClient, CatalogUnavailable, CircuitOpen, LRUCacheBackend, get_catalog, make_async_http_client,
+    reset_catalog,
+)
+from .facets import rebuild_category_facets
+from .jobs import process_jobs
+from .models import CategoryFacet, Product, UpstreamJob, category_key_for
+from .page_cache import CSRF_SENTINEL, page_version
+from .pagination import KeysetPaginator, Page, encode_cursor, paginate_list
+from .search import match_expression, search_products
+from .serializers import ProductSerializer
+from .testing import FakePlatziAPI, make_api_product
+from .views import LOCAL_ORDERING, MIRROR_ORDERING, local_products_for, mirror_products_for
+
+
+def fake_response(status_code=200, payload=None):
+    """Respuesta falsa de la API de Platzi"""
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = payload
+    return response
+
+
+API_PRODUCTS = [
+    {'id': 1, 'title': 'Camisa', 'price': 10, 'description': 'Camisa azul',
+     'category': {'id': 1, 'name': 'Clothes'}, 'images': ['https://img/1.png']},
+    {'id': 2, 'title': 'Laptop', 'price': 900, 'description': 'Laptop gamer',
+     'category': {'id': 2, 'name': 'Electronics'}, 'images': ['https://img/2.png']},
+]
+
+
+class CatalogClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client_api = CatalogClient('https://api.test/products', backend=LRUCacheBackend(),
+                                        ttl=60, stale_ttl=300, negative_ttl=30)
+
+    @mock.patch('requests.Session.request')
+    def test_fresh_entries_are_served_from_cache(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS)
+        self.client_api.list_products()
+        self.client_api.list_products()
+        self.assertEqual(get.call_count, 1)
+
+    @mock.patch('requests.Session.request')
+    def test_missing_products_are_cached(self, get):
+        get.return_value = fake_response(status_code=404)
+        self.assertIsNone(self.client_api.get_product(99))
+        self.assertIsNone(self.client_api.get_product(99))
+        self.assertEqual(get.call_count, 1)
+
+    @mock.patch('requests.Session.request')
+    def test_stale_entry_is_served_while_revalidating(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS)
+        with mock.patch('products.catalog.time.time', return_value=1000):
+            self.client_api.list_products()
+        with mock.patch('products.catalog.time.time', return_value=1100), \
+                mock.patch.object(self.client_api, '_refresh_in_background') as refresh:
+            self.assertEqual(self.client_api.list_products(), API_PRODUCTS)
+        refresh.assert_called_once()
+        self.assertEqual(get.call_count, 1)
+
+    def test_concurrent_misses_share_one_request(self):
+        release = threading.Event()
+        calls = []
+
+        def slow_get(method, url, **kwargs):
+            calls.append(url)
+            release.wait(5)
+            return fake_response(payload=API_PRODUCTS)
+
+        results = []
+        with mock.patch('requests.Session.request', side_effect=slow_get):
+            threads = [
+                threading.Thread(target=lambda: results.append(self.client_api.list_products()))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            # Dar tiempo a que todos los hilos lleguen antes de liberar la respuesta
+            time.sleep(0.1)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [API_PRODUCTS] * 5)
+
+    @mock.patch('requests.Session.request', side_effect=requests.ConnectionError)
+    def test_connection_errors_raise_catalog_unavailable(self, get):
+        with self.assertRaises(CatalogUnavailable):
+            self.client_api.list_products()
+
+    def test_open_breaker_fails_fast_and_serves_expired_copy(self):
+        with mock.patch('requests.Session.request', return_value=fake_response(payload=API_PRODUCTS)), \
+                mock.patch('products.catalog.time.time', return_value=1000):
+            self.client_api.list_products()
+
+        with mock.patch('requests.Session.request', side_effect=requests.ConnectionError) as request, \
+                mock.patch('products.catalog.time.time', return_value=2000):
+            for _ in range(self.client_api.breaker.failure_threshold):
+                self.assertEqual(self.client_api.list_products(), API_PRODUCTS)
+            self.assertEqual(self.client_api.breaker.state, 'open')
+            with self.assertRaises(CircuitOpen):
+                self.client_api.get_product(1)
+        self.assertEqual(request.call_count, self.client_api.breaker.failure_threshold)
+
+
+class ProductViewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_catalog()
+        self.addCleanup(reset_catalog)
+
+    @mock.patch('requests.Session.request')
+    def test_product_list_makes_one_upstream_call_per_render(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS)
+        response = self.client.get('/', {'category': 'Clothes'})
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual([c['name'] for c in response.context['all_categories']], ['Clothes', 'Electronics'])
+        self.assertEqual(response.context['total_api_products'], 1)
+
+    @mock.patch('requests.Session.request')
+    def test_product_detail_uses_catalog_cache(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS[0])
+        for _ in range(3):
+            response = self.client.get('/product/1/')
+            self.assertContains(response, 'Camisa')
+        self.assertEqual(get.call_count, 1)
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_catalog()
+        self.addCleanup(reset_catalog)
+        self.product = Product.objects.create(title='Mesa', price=10, description='Roble',
+                                              category='Hogar', image='https://img.test/m.png')
+
+    @mock.patch('requests.Session.request')
+    def test_second_visit_is_served_without_orm_or_api(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS)
+        self.assertEqual(self.client.get('/', {'category': 'Hogar'})['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get('/', {'category': 'Hogar'})
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(get.call_count, 1)
+        self.assertContains(response, 'Mesa')
+        # Cada visitante recibe su propio token CSRF, nunca el marcador
+        self.assertNotContains(response, CSRF_SENTINEL)
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+
+    @mock.patch('requests.Session.request')
+    def test_product_changes_and_catalog_refresh_invalidate_pages(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS)
+        self.client.get('/')
+        self.product.title = 'Mesa nueva'
+        self.product.save()
+        response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Mesa nueva')
+
+        get_catalog().invalidate()
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'miss')
+
+    @mock.patch('requests.Session.request')
+    def test_logged_in_users_are_not_cached(self, get):
+        get.return_value = fake_response(payload=API_PRODUCTS)
+        User.objects.create_user(username='ana', password='clave-segura-123')
+        self.client.login(username='ana', password='clave-segura-123')
+        self.assertNotIn('X-Page-Cache', self.client.get('/'))
+
+
+@override_settings(PRODUCTS_PAGE_SIZE=4)
+@override_settings(PLATZI_CATALOG={'SOURCE': 'mirror'})
+class ProductCardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            api_id=7, origin=Product.ORIGIN_MIRROR, title='Viejo titulo', price=5, description='d',
+            category='Hogar', image='https://img.test/7.png', api_updated_at='2025-01-01T00:00:00Z',
+        )
+
+    def test_editing_a_mirrored_product_refreshes_its_api_card(self):
+        self.assertContains(self.client.get('/'), 'Viejo titulo')
+        self.client.post('/edit-api/7/', {'title': 'Nuevo titulo', 'price': '5', 'description': 'd',
+                                          'category': 'Hogar', 'image': 'https://img.test/7.png'})
+        response = self.client.get('/')
+        self.assertNotContains(response, 'Viejo titulo')
+        self.assertContains(response, 'Nuevo titulo')
+
+
+class ProductListPaginationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_catalog()
+        self.addCleanup(reset_catalog)
+        Product.objects.bulk_create([
+            Product(title=f'Local {i}', price=i, description='', category='Hogar', image='https://img.test/l.png')
+            for i in range(10)
+        ])
+        # Empates en created_at: el id desempata el orden del cursor
+        Product.objects.filter(pk__in=list(Product.objects.values_list('pk', flat=True)[:5])).update(
+            created_at='2025-01-01T00:00:00Z'
+        )
+
+    def walk(self, section, next_key):
+        seen, url = [], '/'
+        while url:
+            response = self.client.get(url if url.startswith('/') else '/' + url)
+            seen.extend(response.context[section])
+            url = response.context[next_key]
+        return seen
+
+    @mock.patch('requests.Session.request')
+    def test_local_products_are_paged_by_cursor(self, get):
+        get.return_value = fake_response(payload=[])
+        products = self.walk('local_products', 'local_next_url')
+        self.assertEqual([p.pk for p in products],
+                         list(Product.objects.order_by('-created_at', 'id').values_list('pk', flat=True)))
+
+    @mock.patch('requests.Session.request')
+    def test_api_products_are_paged_by_cursor(self, get):
+        get.return_value = fake_response(payload=[make_api_product(i) for i in range(1, 11)])
+        products = self.walk('api_products', 'api_next_url')
+        self.assertEqual([p['id'] for p in products], list(range(1, 11)))
+        self.assertEqual(get.call_count, 1)
+
+    def test_stale_or_invalid_api_cursor_returns_an_empty_page(self):
+        items = [make_api_product(i) for i in range(1, 6)]
+        self.assertEqual([p['id'] for p in paginate_list(items, encode_cursor([2]), 2).items], [3, 4])
+        # El producto del cursor se eliminó: no se vuelve a la primera página
+        self.assertEqual(paginate_list(items, encode_cursor([99]), 2), Page([], None))
+        self.assertEqual(paginate_list(items, 'no-es-un-cursor', 2), Page([], None))
+
+
+class ProductQueryPlanTests(TestCase):
+    """EXPLAIN de las consultas de product_list: deben usar los índices y no ordenar en memoria"""
+
+    # Cómo aparece en el plan un ordenamiento en memoria, según el motor
+    MEMORY_SORT = {'sqlite': 'TEMP B-TREE', 'postgresql': 'Sort'}
+
+    def setUp(self):
+        if connection.vendor not in self.MEMORY_SORT:
+            self.skipTest(f'sin planes esperados para {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            # Con una tabla casi vacía Postgres prefiere recorrerla entera
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        Product.objects.create(title='Camisa', price=10, description='', category=' Clothes ',
+                               image='https://img.test/c.png')
+
+    def plan(self, queryset, ordering, cursor=None):
+        return KeysetPaginator(ordering, 24).queryset_for(queryset, cursor).explain()
+
+    def assertNoMemorySort(self, plan):
+        self.assertNotIn(self.MEMORY_SORT[connection.vendor], plan)
+
+    def test_category_key_is_normalized_on_save(self):
+        self.assertEqual(Product.objects.get().category_key, 'clothes')
+        self.assertEqual(category_key_for('CLOTHES'), 'clothes')
+
+    def test_local_list_uses_created_index(self):
+        plan = self.plan(local_products_for('all'), LOCAL_ORDERING)
+        self.assertIn('product_created_idx', plan)
+        self.assertNoMemorySort(plan)
+
+    def test_category_filter_uses_composite_index(self):
+        cursor = encode_cursor([Product.objects.get().created_at, 1])
+        for page_cursor in (None, cursor):
+            plan = self.plan(local_products_for('Clothes'), LOCAL_ORDERING, page_cursor)
+            self.assertIn('product_category_created_idx', plan)
+            self.assertNoMemorySort(plan)
+
+    def test_mirror_category_filter_uses_api_index(self):
+        plan = self.plan(mirror_products_for('clothes'), MIRROR_ORDERING)
+        self.assertIn('product_category_api_idx', plan)
+        self.assertNoMemorySort(plan)
+
+    def test_icontains_search_uses_trigram_index(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('los índices trigram solo existen en PostgreSQL')
+        plan = Product.objects.filter(title__icontains='cami').explain()
+        self.assertIn('product_title_trgm_idx', plan)
+
+
+class CategoryFacetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_catalog()
+        self.addCleanup(reset_catalog)
+
+    def counts(self):
+        return {f.key: (f.name, f.local_count, f.api_count) for f in CategoryFacet.objects.all()}
+
+    def create(self, category, **fields):
+        return Product.objects.create(title='P', price=1, description='', category=category,
+                                      image='https://img.test/p.png', **fields)
+
+    def test_counts_follow_saves_and_deletes(self):
+        shirt = self.create('Clothes')
+        self.create('clothes ', api_id=7, origin=Product.ORIGIN_API_COPY)
+        self.create('Shoes', api_id=8, origin=Product.ORIGIN_MIRROR)
+        self.assertEqual(self.counts(), {'clothes': ('clothes', 2, 1), 'shoes': ('Shoes', 0, 1)})
+
+        shirt.category = 'Shoes'
+        shirt.save()
+        self.assertEqual(self.counts()['shoes'][1:], (1, 1))
+        shirt.delete()
+        self.assertEqual(self.counts()['shoes'][1:], (0, 1))
+
+        incremental = self.counts()
+        rebuild_category_facets()
+        self.assertEqual({k: v[1:] for k, v in self.counts().items() if any(v[1:])},
+                         {k: v[1:] for k, v in incremental.items() if any(v[1:])})
+
+    def test_sync_updates_api_counts(self):
+        products = [make_api_product(1), make_api_product(2), make_api_product(3, category='Shoes')]
+        with FakePlatziAPI(products) as api:
+            call_command('sync_catalog', base_url=api.url, page_size=2, stdout=mock.Mock())
+            self.assertEqual(self.counts(), {'clothes': ('Clothes', 0, 2), 'shoes': ('Shoes', 0, 1)})
+
+            api.products[1].update(category={'name': 'Shoes'}, updatedAt='2025-02-01T00:00:00.000Z')
+            del api.products[2]
+            call_command('sync_catalog', base_url=api.url, page_size=2, stdout=mock.Mock())
+        self.assertEqual(self.counts(), {'clothes': ('Clothes', 0, 0), 'shoes': ('Shoes', 0, 2)})
+
+    @override_settings(PLATZI_CATALOG={'SOURCE': 'mirror'})
+    def test_product_list_reads_counts_from_facets(self):
+        self.create('Hogar')
+        self.create('Shoes', api_id=8, origin=Product.ORIGIN_MIRROR)
+        with self.assertNumQueries(6):
+            response = self.client.get('/')
+        self.assertEqual(response.context['all_categories'], [
+            {'name': 'Hogar', 'api_count': 0, 'local_count': 1},
+            {'name': 'Shoes', 'api_count': 1, 'local_count': 0},
+        ])
+
+
+class ProductSearchTests(TestCase):
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('la búsqueda FTS5 solo existe en SQLite')
+        for title, description, category in [
+            ('Camiseta clásica', 'Algodón suave para el verano', 'Clothes'),
+            ('Zapatillas running', 'Ligeras, con suela de <b>goma</b>', 'Shoes'),
+            ('Camisa de lino', 'Ideal para el calor del verano', 'Clothes'),
+        ]:
+            Product.objects.create(title=title, price=10, description=description,
+                                   category=category, image='https://img.test/p.png')
+
+    def titles(self, query):
+        return [result.product.title for result in search_products(query)]
+
+    def test_prefix_match_and_ranking(self):
+        self.assertCountEqual(self.titles('cami'), ['Camisa de lino', 'Camiseta clásica'])
+        # Una coincidencia en el título pesa más que en la descripción
+        Product.objects.create(title='Pantalón', price=5, description='Combina con tu camisa',
+                               category='Clothes', image='https://img.test/p.png')
+        self.assertEqual(self.titles('camisa')[0], 'Camisa de lino')
+        self.assertEqual(self.titles('clasica verano'), ['Camiseta clásica'])
+
+    def test_index_follows_updates_and_deletes(self):
+        product = Product.objects.get(title='Camisa de lino')
+        product.title = 'Pañuelo de lino'
+        product.save()
+        self.assertEqual(self.titles('camis'), ['Camiseta clásica'])
+        Product.objects.filter(category='Shoes').delete()
+        self.assertEqual(self.titles('zapatillas'), [])
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        result = search_products('goma')[0]
+        self.assertIn('<mark>goma</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+        self.assertEqual(match_expression('"a" OR b*'), '"a"* "OR"* "b"*')
+
+    def test_html_and_json_endpoints(self):
+        response = self.client.get('/search/', {'q': 'verano'})
+        self.assertEqual(len(response.context['results']), 2)
+        self.assertContains(response, '<mark>verano</mark>')
+
+        data = self.client.get('/search.json', {'q': 'zapa', 'limit': 5}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['title_highlighted'], '<mark>Zapatillas</mark> running')
+
+
+class ProductAPITests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(title='Camisa', price=10, description='Lino',
+                                              category='Clothes', image='https://img.test/c.png')
+
+    def test_conditional_get_skips_serialization(self):
+        response = self.client.get(f'/api/products/{self.product.pk}/')
+        self.assertEqual(response.json()['title'], 'Camisa')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(ProductSerializer, 'to_representation') as serialize:
+            # El contador del throttle y el updated_at de la fila
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+            # Sin cambios en la fila, la representación sale de la caché
+            self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').json()['title'], 'Camisa')
+        serialize.assert_not_called()
+
+        self.product.title = 'Camisa nueva'
+        self.product.save()
+        response = self.client.get(f'/api/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Camisa nueva')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_with_writes(self):
+        etag = self.client.get('/api/products/')['ETag']
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Product.objects.create(title='Zapato', price=5, description='', category='Shoes',
+                               image='https://img.test/z.png')
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(self.client.get('/api/products/', {'category': 'shoes'}).json()['count'], 1)
+
+    def test_writes_require_authentication(self):
+        data = {'title': 'Gorra', 'price': '7.00', 'description': 'Lana', 'category': 'Hats',
+                'image': 'https://img.test/g.png'}
+        self.assertEqual(self.client.post('/api/products/', data).status_code, 401)
+
+        self.client.force_login(User.objects.create_user('ana', password='x'))
+        response = self.client.post('/api/products/', data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.get(pk=response.json()['id']).category_key, 'hats')
+        self.assertEqual(self.client.delete(f'/api/products/{self.product.pk}/').status_code, 204)
+
+
+class BulkImportExportTests(TestCase):
+
+    CSV = (
+        'title,price,description,category,image\n'
+        'Camisa,10.50,Lino,Clothes,https://img.test/1.png\n'
+        'Sin precio,,Algo,Clothes,https://img.test/2.png\n'
+        'Zapato,20,Cuero,Shoes,https://img.test/3.png\n'
+    )
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def test_import_validates_rows_and_updates_facets(self):
+        stats = import_products(io.BytesIO(self.CSV.encode()), 'csv', batch_size=2)
+        self.assertEqual((stats['imported'], stats['invalid']), (2, 1))
+        self.assertEqual(stats['errors'][0]['line'], 3)
+        self.assertEqual(Product.objects.get(title='Zapato').category_key, 'shoes')
+        self.assertEqual(CategoryFacet.objects.get(key='clothes').local_count, 1)
+
+    def test_import_view_accepts_ndjson(self):
+        lines = [json.dumps({'title': f'P{i}', 'price': i, 'description': 'd', 'category': 'Hogar',
+                             'image': 'https://img.test/p.png'}) for i in range(5)]
+        upload = SimpleUploadedFile('products.ndjson', '\n'.join(lines).encode())
+        response = self.client.post('/import/', {'file': upload}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['imported'], 5)
+
+    def test_malformed_ndjson_line_is_an_invalid_row(self):
+        lines = [json.dumps({'title': f'P{i}', 'price': i, 'description': 'd', 'category': 'Hogar',
+                             'image': 'https://img.test/p.png'}) for i in range(1, 8)]
+        lines[5] = '{"title": "roto",'
+        stats = import_products(io.BytesIO('\n'.join(lines).encode()), 'ndjson', batch_size=2)
+        self.assertEqual((stats['imported'], stats['invalid']), (6, 1))
+        self.assertEqual(stats['errors'][0]['line'], 6)
+        self.assertEqual(sorted(Product.objects.values_list('title', flat=True)),
+                         ['P1', 'P2', 'P3', 'P4', 'P5', 'P7'])
+
+    def test_export_streams_every_product(self):
+        import_products(io.BytesIO(self.CSV.encode()), 'csv')
+        response = self.client.get('/export/', {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Camisa', 'Zapato'])
+
+        response = self.client.get('/export/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'api_id', 'origin', 'title'])
+        self.assertEqual(len(lines), 3)
+
+
+class UpstreamJobTests(TestCase):
+
+    FORM = {'title': 'Nuevo', 'price': '5', 'description': 'd', 'category': '1',
+            'image': 'https://img.test/n.png'}
+
+    def setUp(self):
+        cache.clear()
+        self.api = FakePlatziAPI([make_api_product(1)]).start()
+        self.addCleanup(self.api.stop)
+        self.catalog = CatalogClient(self.api.url)
+
+    def make_ready(self):
+        UpstreamJob.objects.update(next_attempt_at='2000-01-01T00:00:00Z')
+
+    def test_create_product_writes_locally_without_calling_the_api(self):
+        with mock.patch('requests.Session.request', side_effect=AssertionError):
+            response = self.client.post('/create/', self.FORM)
+        self.assertRedirects(response, '/')
+        product = Product.objects.get(title='Nuevo')
+        self.assertEqual(product.sync_status, Product.SYNC_PENDING)
+        self.assertEqual(product.upstream_jobs.get().status, UpstreamJob.STATUS_PENDING)
+
+    def test_retries_transient_failures_and_backfills_api_id(self):
+        self.client.post('/create/', self.FORM)
+        self.api.failures = 1
+        self.assertEqual(process_jobs(self.catalog)['retried'], 1)
+        job = UpstreamJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (UpstreamJob.STATUS_PENDING, 1))
+        # El reintento espera al backoff
+        self.assertEqual(process_jobs(self.catalog)['claimed'], 0)
+
+        self.make_ready()
+        self.assertEqual(process_jobs(self.catalog)['done'], 1)
+        product = Product.objects.get(title='Nuevo')
+        self.assertEqual((product.api_id, product.sync_status), (2, Product.SYNC_SYNCED))
+
+    def test_replayed_job_does_not_duplicate_the_product(self):
+        self.client.post('/create/', self.FORM)
+        process_jobs(self.catalog)
+        # Como si la respuesta se hubiera perdido: el trabajo se ejecuta otra vez
+        UpstreamJob.objects.update(status=UpstreamJob.STATUS_PENDING)
+        self.make_ready()
+        process_jobs(self.catalog)
+        self.assertEqual(sorted(self.api.products), [1, 2])
+
+
+class BulkDeleteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.api = FakePlatziAPI([make_api_product(i) for i in range(1, 31)], latency=0.05).start()
+        self.addCleanup(self.api.stop)
+        self.catalog = CatalogClient(self.api.url)
+        call_command('sync_catalog', base_url=self.api.url, stdout=mock.Mock())
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+
+    def test_bulk_delete_removes_local_rows_and_fans_out_upstream(self):
+        response = self.client.post('/api/products/bulk-delete/', {'api_ids': list(range(1, 31)) + [99]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['deleted_locally'], 30)
+        self.assertFalse(Product.objects.exists())
+        self.assertEqual(CategoryFacet.objects.get(key='clothes').api_count, 0)
+
+        started = time.monotonic()
+        stats = process_jobs(self.catalog, batch_size=31, concurrency=8)
+        # 31 DELETE de 50 ms en paralelo, no en serie (1,5 s)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(stats['done'], 31)
+        self.assertEqual(self.api.products, {})
+
+        report = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(report['pending'], 0)
+        results = {item['api_id']: item['result']['deleted'] for item in report['results']}
+        self.assertTrue(results[1])
+        self.assertFalse(results[99])
+
+    def test_deleting_an_unpublished_product_cancels_its_creation(self):
+        self.client.post('/create/', {'title': 'Nuevo', 'price': '5', 'description': 'd',
+                                      'category': '1', 'image': 'https://img.test/n.png'})
+        product = Product.objects.get(title='Nuevo')
+        self.client.post(f'/delete/{product.pk}/')
+        self.assertEqual(UpstreamJob.objects.get().status, UpstreamJob.STATUS_CANCELLED)
+        self.assertEqual(process_jobs(self.catalog)['claimed'], 0)
+        self.assertEqual(len(self.api.products), 30)
+
+    def test_bulk_delete_rejects_oversized_payloads(self):
+        response = self.client.post('/api/products/bulk-delete/',
+                                    {'api_ids': list(range(1, BULK_DELETE_MAX_IDS + 2))},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('api_ids', response.json())
+        self.assertEqual(Product.objects.count(), 30)
+
+    def test_bulk_delete_requires_staff(self):
+        self.client.logout()
+        response = self.client.post('/api/products/bulk-delete/', {'ids': [1]}, content_type='application/json')
+        self.assertIn(response.status_code, (401, 403))
+
+
+class AsyncProductViewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.api = FakePlatziAPI([make_api_product(1), make_api_product(2, 'Electronics')]).start()
+        self.addCleanup(self.api.stop)
+        reset_catalog()
+        self.addCleanup(reset_catalog)
+        patcher = override_settings(PLATZI_API_BASE_URL=self.api.url.rsplit('/', 1)[0] + '/')
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    async def test_async_product_list_and_detail(self):
+        response = await self.async_client.get('/async/', {'category': 'Electronics'})
+        self.assertEqual(response.context['total_api_products'], 1)
+        self.assertEqual([c['name'] for c in response.context['all_categories']], ['Clothes', 'Electronics'])
+
+        response = await self.async_client.get('/async/product/2/')
+        self.assertContains(response, 'Producto 2')
+        self.assertEqual(len(self.api.requests), 2)
+
+    async def test_async_http_clients_are_closed(self):
+        clients = []
+
+        def make_client():
+            clients.append(make_async_http_client())
+            return clients[-1]
+
+        with mock.patch('products.catalog.make_async_http_client', make_client):
+            await self.async_client.get('/async/')
+            await self.async_client.get('/async/product/2/')
+        self.assertEqual(len(clients), len(self.api.requests))
+        self.assertTrue(all(client.is_closed for client in clients))
+
+    async def test_async_catalog_create_invalidates_cached_pages(self):
+        version = await sync_to_async(page_version)()
+        await get_catalog().acreate_product({'title': 'Nuevo', 'price': 5, 'description': 'd',
+                                              'categoryId': 1, 'images': ['https://img.test/n.png']})
+        self.assertGreater(await sync_to_async(page_version)(), version)
+
+    async def test_async_create_and_delete(self):
+        await self.async_client.post('/async/create/', {
+            'title': 'Nuevo', 'price': '5', 'description': 'd', 'category': '1',
+            'image': 'https://img.test/n.png',
+        })
+        product = await Product.objects.aget(title='Nuevo')
+        self.assertEqual(product.sync_status, Product.SYNC_PENDING)
+        self.assertNotIn(3, self.api.products)
+
+        await sync_to_async(call_command)('process_upstream_jobs', stdout=mock.Mock())
+        await product.arefresh_from_db()
+        self.assertEqual((product.api_id, product.sync_status), (3, Product.SYNC_SYNCED))
+        self.assertIn(3, self.api.products)
+
+        await self.async_client.post('/async/api-delete/3/')
+        self.assertFalse(await Product.objects.filter(api_id=3).aexists())
+        await sync_to_async(call_command)('process_upstream_jobs', stdout=mock.Mock())
+        self.assertNotIn(3, self.api.products)
+
+
+class SyncCatalogTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.api = FakePlatziAPI([make_api_product(i) for i in range(1, 6)]).start()
+        self.addCleanup(self.api.stop)
+
+    def sync(self):
+        call_command('sync_catalog', base_url=self.api.url, page_size=2, stdout=mock.Mock())
+
+    def test_sync_mirrors_every_page(self):
+        self.sync()
+        mirror = Product.objects.filter(origin=Product.ORIGIN_MIRROR)
+        self.assertEqual(sorted(mirror.values_list('api_id', flat=True)), [1, 2, 3, 4, 5])
+        self.assertEqual(mirror.get(api_id=3).title, 'Producto 3')
+
+    def test_sync_updates_changes_and_respects_local_copies(self):
+        self.sync()
+        Product.objects.filter(api_id=1).update(origin=Product.ORIGIN_API_COPY, title='Editado')
+        self.api.products[2].update(title='Nuevo título', updatedAt='2025-02-01T00:00:00.000Z')
+        del self.api.products[5]
+
+        self.sync()
+
+        self.assertEqual(Product.objects.get(api_id=1).title, 'Editado')
+        self.assertEqual(Product.objects.get(api_id=2).title, 'Nuevo título')
+        self.assertFalse(Product.objects.filter(api_id=5).exists())
+
+    def test_short_or_empty_upstream_does_not_wipe_the_mirror(self):
+        self.sync()
+        for api_id in (2, 3, 4, 5):
+            del self.api.products[api_id]
+        with self.assertLogs('products.sync', 'WARNING'):
+            self.sync()
+        self.assertEqual(Product.objects.filter(origin=Product.ORIGIN_MIRROR).count(), 5)
+
+        self.api.products.clear()
+        with self.assertLogs('products.sync', 'WARNING'):
+            self.sync()
+        self.assertEqual(Product.objects.filter(origin=Product.ORIGIN_MIRROR).count(), 5)
+
+    def test_prune_does_not_bind_one_parameter_per_product(self):
+        self.sync()
+        del self.api.products[5]
+        with CaptureQueriesContext(connection) as queries:
+            self.sync()
+        self.assertFalse(Product.objects.filter(api_id=5).exists())
+        self.assertFalse([query['sql'] for query in queries if 'NOT' in query['sql']])
+
+    @override_settings(PLATZI_CATALOG={'SOURCE': 'mirror'})
+    def test_views_serve_the_mirror_without_network(self):
+        self.sync()
+        with mock.patch('requests.Session.request', side_effect=AssertionError):
+            response = self.client.get('/')
+            self.assertEqual(response.context['total_api_products'], 5)
+            self.assertEqual(response.context['total_local_products'], 0)
+            self.assertContains(self.client.get('/product/4/'), 'Producto 4')
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        replica = dict(connections.settings['default'], NAME='file:replica?mode=ro')
+        patcher = mock.patch.dict(connections.settings, {READ_REPLICA_ALIAS: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica_only_inside_context(self):
+        self.assertIsNone(self.router.db_for_read(Product))
+        with read_replica():
+            self.assertEqual(self.router.db_for_read(Product), READ_REPLICA_ALIAS)
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_reads_inside_transaction_stay_on_default(self):
+        with read_replica(), mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate(READ_REPLICA_ALIAS, 'products'))
+        self.assertTrue(self.router.allow_migrate('default', 'products'))
+
+    def test_production_pragmas_apply_on_connect(self):
+        raw = sqlite3.connect(':memory:')
+        for statement in sqlite_init_command(SQLITE_PRODUCTION_PRAGMAS).split(';'):
+            raw.execute(statement)
+        self.assertEqual(raw.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+        self.assertEqual(raw.execute('PRAGMA cache_size').fetchone()[0], -65536)
+        raw.close()
+
+
+class TemplateWarmupTests(SimpleTestCase):
+
+    def test_project_templates_are_found_once(self):
+        names = template_names()
+        self.assertIn('products/base.html', names)
+        self.assertIn('login.html', names)
+        self.assertEqual(len(names), len(set(names)))
+        self.assertFalse(any(name.startswith('admin/') for name in names))
+
+    def test_warm_templates_fills_the_cached_loader(self):
+        loader = django_engine().template_loaders[0]
+        loader.reset()
+        self.addCleanup(loader.reset)
+        results = warm_templates(['products/base.html', 'products/product_list.html'])
+        self.assertEqual([error for _, _, error in results], [None, None])
+        self.assertIn('products/product_list.html', loader.get_template_cache)
+
+
+@query_budget(2)
+def n_plus_one_view(request):
+    """Vista de prueba: una consulta por producto"""
+    for product in Product.objects.all():
+        Product.objects.filter(pk=product.pk).exists()
+    return HttpResponse('ok')
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+
+    def setUp(self):
+        for index in range(3):
+            Product.objects.create(title=f"P{index}", price=1, description="d", category="c", image="i")
+        self.request = RequestFactory().get('/n-plus-one/')
+
+    def run_view(self, view):
+        middleware = QueryBudgetMiddleware(lambda request: view(request))
+        # El orden real de Django: process_view antes de llamar a la vista
+        middleware.process_view(self.request, view, (), {})
+        return middleware(self.request)
+
+    def test_exceeding_the_budget_fails_the_test_suite(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "hizo 4 consultas (presupuesto: 2)"):
+            self.run_view(n_plus_one_view)
+
+    @override_settings(QUERY_BUDGET={'RAISE': False, 'HEADERS': True, 'N_PLUS_ONE_THRESHOLD': 3})
+    def test_reports_n_plus_one_and_timing_headers(self):
+        with self.assertLogs('platzi_store.middleware', 'WARNING') as logs:
+            response = self.run_view(n_plus_one_view)
+        self.assertEqual(response['X-DB-Queries'], '4')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertTrue(any('Posible N+1' in line and '3 consultas iguales' in line for line in logs.output))
+        self.assertTrue(any('presupuesto: 2' in line for line in logs.output))
+        self.assertEqual(self.request.query_stats.count, 4)
+
+    def test_budget_is_read_from_decorated_views_and_viewsets(self):
+        from .api import ProductViewSet
+        from .views import product_list
+        from platzi_store.middleware import budget_for
+        self.assertEqual(budget_for(product_list), 10)
+        self.assertEqual(budget_for(ProductViewSet.as_view({'get': 'list'})), 15)
+
+    def test_transaction_control_is_not_counted_and_classes_are_named(self):
+        stats = QueryStats()
+        for sql in ('BEGIN', 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"', 'SELECT 1', 'COMMIT'):
+            stats(lambda *args: None, sql, None, False, {})
+        self.assertEqual((stats.count, list(stats.statements)), (1, ['SELECT 1']))
+
+        from .api import ProductViewSet
+        self.request = RequestFactory().get('/api/products/')
+        QueryBudgetMiddleware(lambda request: None).process_view(
+            self.request, ProductViewSet.as_view({'get': 'list'}), (), {})
+        self.assertEqual(self.request._query_budget_view, 'ProductViewSet')
+
+    def assertMiddlewareNotAdapted(self, middleware_name):
+        logger = logging.getLogger('django.request')
+        # Django solo informa las adaptaciones con DEBUG
+        with self.settings(DEBUG=True), self.assertLogs(logger, 'DEBUG') as logs:
+            ASGIHandler()
+            logger.debug("middleware cargados")
+        self.assertFalse([line for line in logs.output if middleware_name in line and 'adapted' in line],
+                         logs.output)
+
+    @override_settings(PLATZI_CATALOG={'SOURCE': 'mirror'},
+                       QUERY_BUDGET={'RAISE': True, 'HEADERS': True, 'N_PLUS_ONE_THRESHOLD': 3})
+    async def test_async_views_are_counted_without_sync_adaptation(self):
+        # Ningún middleware obliga a pasar la cadena a sync
+        self.assertMiddlewareNotAdapted('platzi_store.middleware')
+
+        await sync_to_async(cache.clear)()
+        sync_count = (await sync_to_async(self.client.get)('/'))['X-DB-Queries']
+        await sync_to_async(cache.clear)()
+        response = await self.async_client.get('/async/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-DB-Queries'], sync_count)
+        self.assertGreater(int(sync_count), 0)
+
+
+@override_settings(PLATZI_CATALOG={'SOURCE': 'mirror'})
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        profiling = override_settings(PROFILING={'DIR': self.directory, 'SAMPLE_RATE': 0, 'MAX_FILES': 5})
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+        Product.objects.create(title="Mesa", price=10, description="Roble", category="Muebles", image="i")
+
+    def test_signed_header_writes_a_profile_with_phases(self):
+        with self.assertLogs('platzi_store.middleware', 'INFO'):
+            response = self.client.get('/', HTTP_X_PROFILE=make_profile_token())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([path.name for path in self.directory.iterdir()], [response['X-Profile']])
+        self.assertTrue(response['X-Profile'].endswith('-GET-root.prof'))
+        for phase in ('http', 'json', 'sql', 'render', 'total'):
+            self.assertIn(f'{phase};dur=', response['Server-Timing'])
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        self.assertNotIn('X-Profile', self.client.get('/'))
+        with self.assertLogs('platzi_store.middleware', 'WARNING'):
+            self.assertNotIn('X-Profile', self.client.get('/search/', HTTP_X_PROFILE='falso:token'))
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_sampled_requests_are_profiled(self):
+        with override_settings(PROFILING={'DIR': self.directory, 'SAMPLE_RATE': 1.0}):
+            with self.assertLogs('platzi_store.middleware', 'INFO') as logs:
+                response = self.client.get('/search/', {'q': 'mesa'})
+        # Solo quien manda el token ve el resultado en la respuesta
+        self.assertNotIn('X-Profile', response)
+        self.assertIn('(sample)', logs.output[0])
+        self.assertEqual(len(list(self.directory.iterdir())), 1)
+
+    async def test_async_requests_pass_through_without_cprofile(self):
+        response = await self.async_client.get('/async/')
+        self.assertNotIn('X-Profile', response)
+        with self.assertLogs('platzi_store.middleware', 'WARNING') as logs:
+            response = await self.async_client.get('/async/', headers={'X-Profile': make_profile_token()})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile', response)
+        self.assertIn('asíncrona', logs.output[0])
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_prune_keeps_the_newest_profiles_within_limits(self):
+        for index in range(5):
+            path = self.directory / f'{index}.prof'
+            path.write_bytes(b'x' * 100)
+            os.utime(path, (index, index))
+        self.assertEqual(prune_profiles(self.directory, max_files=3, max_bytes=250), 3)
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['3.prof', '4.prof'])
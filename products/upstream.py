@@ -0,0 +1,139 @@
+"""
+Conexiones HTTP salientes hacia la API de Platzi.
+
+Una sola ``requests.Session`` por proceso con pool de conexiones
+persistentes, reintentos con backoff aleatorio (jitter) para los métodos
+idempotentes y un circuit breaker que deja de llamar a la API mientras está
+caída para fallar de inmediato en lugar de esperar el timeout.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Métodos que se pueden reintentar sin riesgo de duplicar efectos
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+
+def build_session(pool_connections=4, pool_maxsize=20, retries=2,
+                  backoff_factor=0.3, backoff_jitter=0.3):
+    """Crea una Session con pool de conexiones y reintentos para métodos idempotentes"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        allowed_methods=IDEMPOTENT_METHODS,
+        status_forcelist=(502, 503, 504),
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def pool_metrics(session):
+    """Uso de los pools de conexiones de una Session (uno por host)"""
+    metrics = []
+    # El mismo adaptador está montado para http:// y https://
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            # La cola del pool guarda conexiones libres y huecos (None) aún sin abrir
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            metrics.append({
+                'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                'maxsize': pool.pool.maxsize,
+                'idle_connections': idle,
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+            })
+    return metrics
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico de tres estados.
+
+    - closed: las llamadas pasan; tras ``failure_threshold`` fallos seguidos se abre.
+    - open: las llamadas se rechazan durante ``reset_timeout`` segundos.
+    - half_open: se deja pasar una llamada de prueba; si funciona se cierra.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """Indica si se puede llamar a la API en este momento"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            state = self._current_state(time.monotonic())
+            if state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    self._times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'state': self._current_state(time.monotonic()),
+                'consecutive_failures': self._failures,
+                'times_opened': self._times_opened,
+                'rejected_calls': self._rejected,
+            }
@@ -1,5 +1,10 @@
 from django.urls import path
-from . import views
+from rest_framework.routers import SimpleRouter
+from . import views, async_views, api
+
+# API REST de productos: /api/products/ y /api/products/<id>/
+router = SimpleRouter()
+router.register('api/products', api.ProductViewSet, basename='product-api')
 
 urlpatterns = [
     path('', views.product_list, name='product_list'),
@@ -9,4 +14,17 @@ urlpatterns = [
     path('edit-api/<int:api_product_id>/', views.edit_api_product, name='edit_api_product'),
     path('delete/<int:product_id>/', views.delete_product, name='delete_product'),
     path('api-delete/<int:product_id>/', views.api_delete_product, name='api_delete_product'),
-]
\ No newline at end of file
+    path('catalog/metrics/', views.catalog_metrics, name='catalog_metrics'),
+    path('search/', views.product_search, name='product_search'),
+    path('search.json', views.product_search_api, name='product_search_api'),
+    path('import/', views.import_products_view, name='import_products'),
+    path('export/', views.export_products_view, name='export_products'),
+    
+    # Versiones asíncronas (ASGI) de las vistas que consultan la API de Platzi
+    path('async/', async_views.product_list_async, name='product_list_async'),
+    path('async/product/<int:product_id>/', async_views.product_detail_async, name='product_detail_async'),
+    path('async/create/', async_views.create_product_async, name='create_product_async'),
+    path('async/api-delete/<int:product_id>/', async_views.api_delete_product_async, name='api_delete_product_async'),
+]
+
+urlpatterns += router.urls
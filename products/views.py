@@ -1,119 +1,256 @@
-import requests
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import JsonResponse
-from .models import Product
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from platzi_store.database import use_read_replica
+from platzi_store.middleware import query_budget
+
+from .bulk import ImportFormatError, export_rows, format_for_filename, import_products
+from .catalog import get_catalog, mirror_enabled, CatalogError, CatalogUnavailable
+from .facets import category_counts
+from .jobs import queue_deletions, queue_product_creation
+from .models import Product, category_key_for
+from .page_cache import anonymous_page_cache
+from .pagination import KeysetPaginator, Page, cached_count, paginate_list
+from .search import MAX_RESULTS, search_products
 import json
+from collections import Counter
 
-# URL base de la API de Platzi
-PLATZI_API_URL = "https://api.escuelajs.co/api/v1/products"
+# Orden de las listas paginadas por cursor (keyset)
+LOCAL_ORDERING = ('-created_at', 'id')
+MIRROR_ORDERING = ('api_id',)
 
-def product_list(request):
-    """Vista para mostrar la lista de productos con filtro por categoría"""
-    
-    # Obtener el filtro de categoría de la URL
-    category_filter = request.GET.get('category', 'all')
-    
-    try:
-        # Obtener productos de la API de Platzi
-        response = requests.get(PLATZI_API_URL, timeout=10)
-        if response.status_code == 200:
-            api_products = response.json()[:50]  # Más productos para mejor filtro
-            
-            # Filtrar productos de API por categoría
-            if category_filter != 'all':
-                api_products = [
-                    product for product in api_products 
-                    if product.get('category', {}).get('name', '').lower() == category_filter.lower()
-                ]
-        else:
-            api_products = []
-            messages.error(request, "Error al cargar productos de la API")
-    except requests.RequestException:
-        api_products = []
-        messages.error(request, "No se pudo conectar con la API de Platzi")
+
+def products_page_size():
+    """Productos por página en cada sección de product_list"""
+    return getattr(settings, 'PRODUCTS_PAGE_SIZE', 24)
+
+
+def mirror_products_for(category_filter):
+    """Productos de la API replicados localmente por sync_catalog"""
+    mirror_products = Product.objects.filter(
+        api_id__isnull=False,
+        origin__in=[Product.ORIGIN_MIRROR, Product.ORIGIN_API_COPY],
+    )
+    if category_filter != 'all':
+        mirror_products = mirror_products.filter(category_key=category_key_for(category_filter))
+    return mirror_products
+
+
+def local_copy_api_ids():
+    """IDs de productos de la API que ya tienen copia local"""
+    return (
+        Product.objects.filter(api_id__isnull=False)
+        .exclude(origin=Product.ORIGIN_MIRROR)
+        .values_list('api_id', flat=True)
+    )
+
+
+def local_products_for(category_filter):
+    """Productos locales (las réplicas de la API no cuentan como locales)"""
+    local_products = Product.objects.exclude(origin=Product.ORIGIN_MIRROR)
+    if category_filter != 'all':
+        # Igualdad sobre la clave normalizada: usa el índice (category_key, -created_at, id)
+        local_products = local_products.filter(category_key=category_key_for(category_filter))
+    return local_products
+
+
+def api_error_message(exc):
+    """Mensaje para el usuario cuando falla la carga del catálogo de la API"""
+    if isinstance(exc, CatalogUnavailable):
+        return "No se pudo conectar con la API de Platzi"
+    return "Error al cargar productos de la API"
+
+
+# Cada sección de product_list es (página, total, {categoría: productos})
+EMPTY_API_SECTION = (Page([], None), 0, {})
+
+
+def api_section_from_mirror(category_filter, cursor):
+    """Página de productos de la API servida desde la réplica local"""
+    mirror_products = mirror_products_for(category_filter)
+    page = KeysetPaginator(MIRROR_ORDERING, products_page_size()).paginate(mirror_products, cursor)
+    return (
+        Page([product.as_api_dict() for product in page.items], page.next_cursor),
+        cached_count(mirror_products),
+        category_counts('api_count'),
+    )
+
+
+def api_section_from_catalog(all_api_products, category_filter, cursor, local_api_ids):
+    """Página de productos de la API a partir del listado cacheado del catálogo"""
     
-    # Obtener productos locales
+    # Filtrar productos de API por categoría
     if category_filter == 'all':
-        local_products = Product.objects.all()
+        api_products = all_api_products
     else:
-        local_products = Product.objects.filter(category__icontains=category_filter)
+        api_products = [
+            product for product in all_api_products 
+            if product.get('category', {}).get('name', '').lower() == category_filter.lower()
+        ]
     
-    # Obtener IDs de productos de API que ya tienen copia local
-    local_api_ids = set(Product.objects.filter(api_id__isnull=False).values_list('api_id', flat=True))
+    # Se copian los diccionarios porque la lista cacheada es compartida,
+    # marcando los productos de API que ya tienen copia local
+    page = paginate_list(api_products, cursor, products_page_size())
+    items = [dict(product, has_local_copy=product.get('id') in local_api_ids) for product in page.items]
     
-    # Marcar productos de API que ya tienen copia local
-    for product in api_products:
-        product['has_local_copy'] = product.get('id') in local_api_ids
+    # Conteo de productos por categoría para el filtro (del mismo listado de la API)
+    api_categories = Counter()
+    for product in all_api_products:
+        category_name = product.get('category', {}).get('name', '')
+        if category_name:
+            api_categories[category_name] += 1
     
-    # Obtener todas las categorías disponibles para el filtro
-    api_categories = set()
-    try:
-        all_products_response = requests.get(PLATZI_API_URL, timeout=10)
-        if all_products_response.status_code == 200:
-            for product in all_products_response.json()[:50]:
-                category_name = product.get('category', {}).get('name', '')
-                if category_name:
-                    api_categories.add(category_name)
-    except:
-        pass
-    
-    local_categories = set(Product.objects.exclude(category='').values_list('category', flat=True))
-    all_categories = sorted(list(api_categories.union(local_categories)))
-    
-    context = {
-        'api_products': api_products,
-        'local_products': local_products,
-        'all_categories': all_categories,
+    return Page(items, page.next_cursor), len(api_products), api_categories
+
+
+def local_section_for(category_filter, cursor):
+    """Página de productos locales, con total cacheado y conteos por categoría"""
+    local_products = local_products_for(category_filter)
+    page = KeysetPaginator(LOCAL_ORDERING, products_page_size()).paginate(local_products, cursor)
+    return page, cached_count(local_products), category_counts('local_count')
+
+
+def page_url(request, **params):
+    """URL de la lista conservando los filtros actuales y reemplazando ``params``"""
+    query = request.GET.copy()
+    for name, value in params.items():
+        if value is None:
+            query.pop(name, None)
+        else:
+            query[name] = value
+    return f"?{query.urlencode()}"
+
+
+def category_filters(api_categories, local_categories):
+    """Botones del filtro: una entrada por categoría con sus conteos de API y locales"""
+    filters = {}
+    for field, counts in (('api_count', api_categories), ('local_count', local_categories)):
+        for name, count in counts.items():
+            entry = filters.setdefault(
+                category_key_for(name), {'name': name, 'api_count': 0, 'local_count': 0}
+            )
+            entry[field] += count
+    return sorted(filters.values(), key=lambda entry: entry['name'])
+
+
+def build_product_list_context(request, category_filter, api_section, local_section):
+    """Arma el contexto de product_list (compartido por la vista síncrona y la asíncrona)"""
+    api_page, total_api_products, api_categories = api_section
+    local_page, total_local_products, local_categories = local_section
+    
+    return {
+        'api_products': api_page.items,
+        'local_products': local_page.items,
+        'all_categories': category_filters(api_categories, local_categories),
         'current_category': category_filter,
-        'total_api_products': len(api_products),
-        'total_local_products': len(local_products),
+        'total_api_products': total_api_products,
+        'total_local_products': total_local_products,
+        'api_next_url': page_url(request, api_cursor=api_page.next_cursor) if api_page.next_cursor else None,
+        'local_next_url': page_url(request, cursor=local_page.next_cursor) if local_page.next_cursor else None,
+        'first_page_url': page_url(request, cursor=None, api_cursor=None),
+        'is_first_page': not (request.GET.get('cursor') or request.GET.get('api_cursor')),
+        # Las tarjetas se cachean por producto y fecha de modificación
+        'card_cache_timeout': getattr(settings, 'PRODUCTS_CARD_CACHE_TIMEOUT', 3600),
     }
+
+
+@query_budget(10)
+@anonymous_page_cache
+@use_read_replica
+def product_list(request):
+    """Vista para mostrar la lista de productos con filtro por categoría"""
+    
+    # Obtener el filtro de categoría y los cursores de página de la URL
+    category_filter = request.GET.get('category', 'all')
+    api_cursor = request.GET.get('api_cursor')
+    
+    if mirror_enabled():
+        # Catálogo replicado por sync_catalog: se sirve desde la base de datos local
+        api_section = api_section_from_mirror(category_filter, api_cursor)
+    else:
+        try:
+            # Una sola consulta a la API, a través de la caché del catálogo
+            api_section = api_section_from_catalog(
+                get_catalog().list_products(), category_filter, api_cursor, set(local_copy_api_ids())
+            )
+        except CatalogUnavailable as exc:
+            # La API no responde: se usa la réplica local de sync_catalog, si la hay
+            api_section = api_section_from_mirror(category_filter, api_cursor)
+            if not api_section[1]:
+                messages.error(request, api_error_message(exc))
+        except CatalogError as exc:
+            api_section = EMPTY_API_SECTION
+            messages.error(request, api_error_message(exc))
+    
+    local_section = local_section_for(category_filter, request.GET.get('cursor'))
+    
+    context = build_product_list_context(request, category_filter, api_section, local_section)
     return render(request, 'products/product_list.html', context)
 
+@query_budget(5)
+@anonymous_page_cache
+@use_read_replica
 def product_detail(request, product_id):
     """Vista para mostrar detalle de un producto de la API"""
-    try:
-        response = requests.get(f"{PLATZI_API_URL}/{product_id}", timeout=10)
-        if response.status_code == 200:
-            product = response.json()
-        else:
-            messages.error(request, "Producto no encontrado")
-            return redirect('product_list')
-    except requests.RequestException:
-        messages.error(request, "Error al cargar el producto")
+    if mirror_enabled():
+        local_product = Product.objects.filter(api_id=product_id).first()
+        product = local_product.as_api_dict() if local_product else None
+    else:
+        try:
+            product = get_catalog().get_product(product_id)
+        except CatalogError as exc:
+            # Si la API no responde se intenta con la copia local del producto
+            local_product = None
+            if isinstance(exc, CatalogUnavailable):
+                local_product = Product.objects.filter(api_id=product_id).first()
+            if local_product is None:
+                messages.error(request, "Error al cargar el producto")
+                return redirect('product_list')
+            product = local_product.as_api_dict()
+    
+    if product is None:
+        messages.error(request, "Producto no encontrado")
         return redirect('product_list')
     
     return render(request, 'products/product_detail.html', {'product': product})
 
+def api_payload_from_post(post):
+    """Datos del formulario de creación con el formato que espera la API de Platzi"""
+    return {
+        "title": post.get('title'),
+        "price": float(post.get('price', 0)),
+        "description": post.get('description'),
+        "categoryId": int(post.get('category', 1)),
+        "images": [post.get('image', 'https://via.placeholder.com/300')]
+    }
+
+def local_product_from_payload(data):
+    """Producto local (sin guardar) equivalente a un payload enviado a la API"""
+    return Product(
+        title=data['title'],
+        price=data['price'],
+        description=data['description'],
+        category=f"Category {data['categoryId']}",
+        image=data['images'][0]
+    )
+
+CREATED_MESSAGE = "Producto creado exitosamente. Se publicará en la API en unos segundos"
+API_DELETED_MESSAGE = "Producto eliminado. Se eliminará de la API en unos segundos"
+
+@query_budget(12)
 def create_product(request):
     """Vista para crear un nuevo producto en la API"""
     if request.method == 'POST':
-        data = {
-            "title": request.POST.get('title'),
-            "price": float(request.POST.get('price', 0)),
-            "description": request.POST.get('description'),
-            "categoryId": int(request.POST.get('category', 1)),
-            "images": [request.POST.get('image', 'https://via.placeholder.com/300')]
-        }
+        data = api_payload_from_post(request.POST)
         
-        try:
-            response = requests.post(PLATZI_API_URL, json=data, timeout=10)
-            if response.status_code == 201:
-                # También guardar localmente
-                Product.objects.create(
-                    title=data['title'],
-                    price=data['price'],
-                    description=data['description'],
-                    category=f"Category {data['categoryId']}",
-                    image=data['images'][0]
-                )
-                messages.success(request, "Producto creado exitosamente")
-                return redirect('product_list')
-            else:
-                messages.error(request, "Error al crear el producto")
-        except requests.RequestException:
-            messages.error(request, "No se pudo conectar con la API")
+        # Se guarda localmente de inmediato; el alta en la API la hace process_upstream_jobs
+        queue_product_creation(local_product_from_payload(data), data)
+        messages.success(request, CREATED_MESSAGE)
+        return redirect('product_list')
     
     return render(request, 'products/create_product.html')
 
@@ -148,6 +285,9 @@ def edit_api_product(request, api_product_id):
             existing_product.description = request.POST.get('description')
             existing_product.category = request.POST.get('category')
             existing_product.image = request.POST.get('image')
+            if existing_product.origin == Product.ORIGIN_MIRROR:
+                # Al editar una réplica se convierte en copia local y sync_catalog ya no la pisa
+                existing_product.origin = Product.ORIGIN_API_COPY
             existing_product.save()
             
             messages.success(request, "Producto actualizado exitosamente (copia local)")
@@ -158,50 +298,53 @@ def edit_api_product(request, api_product_id):
     else:
         # Si no existe, obtenemos el producto de la API y creamos la copia
         try:
-            response = requests.get(f"{PLATZI_API_URL}/{api_product_id}", timeout=10)
-            if response.status_code == 200:
-                api_product = response.json()
-                
-                if request.method == 'POST':
-                    # Crear nueva copia local con los datos editados
-                    Product.objects.create(
-                        api_id=api_product_id,
-                        title=request.POST.get('title'),
-                        price=request.POST.get('price'),
-                        description=request.POST.get('description'),
-                        category=request.POST.get('category', 'Sin categoría'),
-                        image=request.POST.get('image')
-                    )
-                    messages.success(request, "Producto copiado y actualizado exitosamente")
-                    return redirect('product_list')
-                
-                # Preparar datos del producto de la API para mostrar en el formulario
-                product_data = {
-                    'id': api_product_id,
-                    'title': api_product.get('title', ''),
-                    'price': api_product.get('price', 0),
-                    'description': api_product.get('description', ''),
-                    'category': api_product.get('category', {}).get('name', 'Sin categoría'),
-                    'image': api_product.get('images', [''])[0] if api_product.get('images') else '',
-                    'is_api_product': True  # Marcar que es de la API
-                }
-                
-                return render(request, 'products/update_product.html', {
-                    'product': product_data,
-                    'is_new_copy': True
-                })
-            else:
-                messages.error(request, "No se pudo obtener el producto de la API")
-                return redirect('product_list')
-        except requests.RequestException:
+            api_product = get_catalog().get_product(api_product_id)
+        except CatalogUnavailable:
             messages.error(request, "Error de conexión con la API")
             return redirect('product_list')
+        except CatalogError:
+            api_product = None
+        
+        if api_product is None:
+            messages.error(request, "No se pudo obtener el producto de la API")
+            return redirect('product_list')
+        
+        if request.method == 'POST':
+            # Crear nueva copia local con los datos editados
+            Product.objects.create(
+                api_id=api_product_id,
+                origin=Product.ORIGIN_API_COPY,
+                title=request.POST.get('title'),
+                price=request.POST.get('price'),
+                description=request.POST.get('description'),
+                category=request.POST.get('category', 'Sin categoría'),
+                image=request.POST.get('image')
+            )
+            messages.success(request, "Producto copiado y actualizado exitosamente")
+            return redirect('product_list')
+        
+        # Preparar datos del producto de la API para mostrar en el formulario
+        product_data = {
+            'id': api_product_id,
+            'title': api_product.get('title', ''),
+            'price': api_product.get('price', 0),
+            'description': api_product.get('description', ''),
+            'category': api_product.get('category', {}).get('name', 'Sin categoría'),
+            'image': api_product.get('images', [''])[0] if api_product.get('images') else '',
+            'is_api_product': True  # Marcar que es de la API
+        }
+        
+        return render(request, 'products/update_product.html', {
+            'product': product_data,
+            'is_new_copy': True
+        })
 
 def delete_product(request, product_id):
     """Vista para eliminar un producto local"""
     if request.method == 'POST':
         product = get_object_or_404(Product, id=product_id)
-        product.delete()
+        # Si el producto se publicó desde aquí, su borrado en la API queda en la cola
+        queue_deletions(product_ids=[product.pk])
         messages.success(request, "Producto eliminado exitosamente")
     
     return redirect('product_list')
@@ -209,13 +352,88 @@ def delete_product(request, product_id):
 def api_delete_product(request, product_id):
     """Vista para eliminar un producto de la API de Platzi"""
     if request.method == 'POST':
-        try:
-            response = requests.delete(f"{PLATZI_API_URL}/{product_id}", timeout=10)
-            if response.status_code == 200:
-                messages.success(request, "Producto eliminado de la API")
-            else:
-                messages.error(request, "Error al eliminar el producto de la API")
-        except requests.RequestException:
-            messages.error(request, "No se pudo conectar con la API")
+        # La copia local se borra ya; el DELETE a la API lo hace process_upstream_jobs
+        queue_deletions(api_ids=[product_id])
+        messages.success(request, API_DELETED_MESSAGE)
     
-    return redirect('product_list')
\ No newline at end of file
+    return redirect('product_list')
+
+@staff_member_required
+def catalog_metrics(request):
+    """Métricas del cliente de la API de Platzi (pool de conexiones y circuit breaker)"""
+    return JsonResponse(get_catalog().metrics())
+
+
+def search_limit(request, default):
+    """Cantidad de resultados pedida en ``?limit=``, acotada a MAX_RESULTS"""
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), MAX_RESULTS))
+    except ValueError:
+        return default
+
+
+@query_budget(8)
+def product_search(request):
+    """Vista de búsqueda de productos por título, descripción y categoría"""
+    query = request.GET.get('q', '').strip()
+    results = search_products(query, search_limit(request, products_page_size())) if query else []
+    return render(request, 'products/search.html', {'query': query, 'results': results})
+
+
+@query_budget(8)
+def product_search_api(request):
+    """Búsqueda de productos en JSON (misma búsqueda que product_search)"""
+    query = request.GET.get('q', '').strip()
+    results = search_products(query, search_limit(request, 20)) if query else []
+    return JsonResponse({
+        'query': query,
+        'count': len(results),
+        'results': [result.as_dict() for result in results],
+    })
+
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+
+@staff_member_required
+def import_products_view(request):
+    """Importación masiva de productos locales desde un archivo CSV o NDJSON"""
+    stats = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, "Selecciona un archivo para importar")
+        else:
+            file_format = request.POST.get('format') or format_for_filename(upload.name)
+            try:
+                # La subida se lee en bloques (los archivos grandes quedan en disco, no en memoria)
+                stats = import_products(upload, file_format, batch_size=IMPORT_BATCH_SIZE)
+            except (ImportFormatError, UnicodeDecodeError) as exc:
+                messages.error(request, f"No se pudo leer el archivo: {exc}")
+            else:
+                messages.success(request, f"{stats['imported']} productos importados")
+                if stats['invalid']:
+                    messages.warning(request, f"{stats['invalid']} filas con errores no se importaron")
+
+    if stats is not None and request.headers.get('Accept') == 'application/json':
+        return JsonResponse(stats)
+    return render(request, 'products/import_products.html', {'stats': stats})
+
+
+@staff_member_required
+@require_GET
+def export_products_view(request):
+    """Exporta la tabla de productos en CSV o NDJSON sin cargarla en memoria"""
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in EXPORT_CONTENT_TYPES:
+        file_format = 'csv'
+    products = Product.objects.all()
+    origin = request.GET.get('origin')
+    if origin:
+        products = products.filter(origin=origin)
+    response = StreamingHttpResponse(
+        export_rows(products, file_format), content_type=EXPORT_CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+    return response